@@ -0,0 +1,723 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Numeric routines over dense coefficient vectors.
+
+A vector is a tuple of coefficients from the greater degree to the
+independent term, so '3x^2 + 5' is (3, 0, 5).
+"""
+
+import cmath
+import math
+import fractions
+from fractions import Fraction
+
+import arithmetic
+import globals as G
+
+# Sizes of the shorter vector from which each product is used
+KARATSUBA_SIZE = 32
+FFT_SIZE = 256
+
+# The vectors longer than DENSE_SIZE with less than a coefficient of each
+# SPARSE_RATIO are kept as {degree: coefficient}, like x^20000000 + 1
+DENSE_SIZE = 64
+SPARSE_RATIO = 8
+
+ROOT_ITERATIONS = 500  # Of the Aberth's method, without numpy
+PRIME = 2 ** 61 - 1  # For the test of repeated roots
+ROOT_DIGITS = 12  # Of the coefficients, like G.format_number shows them
+ROOT_ERROR = 1e-15  # Relative, of the coefficients made with floats
+CLUSTER_DISTANCE = 1e-2  # Relative, of the roots that can be a multiple one
+
+
+def make_vector(coefficients, exact=False, sparse=False):
+    """
+    Get the dense vector of a {degree: coefficient} dictionary, or None if
+    some degree isn't a natural number. The coefficients are floats, or
+    are kept as they are if exact is True.
+
+    None is also returned if a coefficient is too big for a float, or if
+    the vector would be mostly zeros, unless sparse is True.
+
+    >>> make_vector({2: 3, 0: 5})
+    (3.0, 0.0, 5.0)
+    >>> make_vector({2: 3, 0: 5}, exact=True)
+    (3, 0, 5)
+    >>> make_vector({20000000: 1, 0: 1}) is None
+    True
+    """
+    zero = 0 if exact else 0.0
+    if not coefficients:
+        return (zero,)
+
+    for degree in coefficients:
+        if degree < 0 or degree != int(degree):
+            return None
+
+    max_degree = int(max(coefficients))
+    if not sparse and max_degree >= DENSE_SIZE and max_degree >= SPARSE_RATIO * len(coefficients):
+        return None
+
+    vector = [zero] * (max_degree + 1)
+    for degree, coefficient in coefficients.items():
+        try:
+            vector[max_degree - int(degree)] = coefficient if exact else float(coefficient)
+        except OverflowError:
+            return None
+
+    return tuple(vector)
+
+
+def make_coefficients(vector):
+    """
+    Get the {degree: coefficient} dictionary of a vector, without zeros.
+
+    >>> make_coefficients((3, 0, 5))
+    {0: 5, 2: 3}
+    """
+    degree = len(vector) - 1
+    coefficients = {}
+    for index, coefficient in enumerate(vector):
+        if coefficient:
+            coefficients[degree - index] = coefficient
+
+    return coefficients
+
+
+def horner(vector, x):
+    """
+    Evaluate the vector in x with the Horner's method:
+        3x^2 + 4x + 5 = (3x + 4)x + 5
+
+    >>> horner((3, 4, 5), 2)
+    25.0
+    """
+    result = 0.0
+    for coefficient in vector:
+        result = result * x + coefficient
+
+    return result
+
+
+def horner_with_derivative(vector, x):
+    """
+    Evaluate the vector and its derivative in x in the same pass.
+
+    >>> horner_with_derivative((3, 4, 5), 2)
+    (25.0, 16.0)
+    """
+    result = 0.0
+    derivative = 0.0
+    for coefficient in vector:
+        derivative = derivative * x + result
+        result = result * x + coefficient
+
+    return (result, derivative)
+
+
+def multiply(vector1, vector2):
+    """
+    Multiply two vectors. The product is chosen by the size of the shorter:
+    the schoolbook product for the small ones, the Karatsuba's for the
+    medium ones, and a convolution by FFT with numpy for the big ones.
+
+    The FFT is only used with floats, the integers are kept exact.
+
+    >>> multiply((1, 1), (1, -1))  # (x + 1)(x - 1)
+    (1, 0, -1)
+    """
+    # The products are made from the independent term
+    vector1 = vector1[::-1]
+    vector2 = vector2[::-1]
+    size = min(len(vector1), len(vector2))
+
+    if size < KARATSUBA_SIZE:
+        result = schoolbook(vector1, vector2)
+
+    elif size >= FFT_SIZE and G.get_numpy() is not None and \
+            not is_exact(vector1) and not is_exact(vector2):
+        result = fft(vector1, vector2)
+
+    else:
+        result = karatsuba(vector1, vector2)
+
+    return tuple(result[::-1])
+
+
+def power(vector, exponent):
+    """
+    Raise a vector to a natural exponent, by squaring.
+
+    >>> power((1, 1), 3)  # (x + 1)^3
+    (1, 3, 3, 1)
+    """
+    result = (1,)
+    while exponent:
+        if exponent & 1:
+            result = multiply(result, vector)
+
+        exponent >>= 1
+        if exponent:
+            vector = multiply(vector, vector)
+
+    return result
+
+
+def is_exact(vector):
+    for coefficient in vector:
+        if type(coefficient) not in [int, long]:
+            return False
+
+    return True
+
+
+def add(vector1, vector2):
+    """
+    Sum two lists of coefficients from the independent term.
+    """
+    if len(vector1) < len(vector2):
+        vector1, vector2 = vector2, vector1
+
+    result = list(vector1)
+    for index, coefficient in enumerate(vector2):
+        result[index] += coefficient
+
+    return result
+
+
+def schoolbook(vector1, vector2):
+    result = [0] * (len(vector1) + len(vector2) - 1)
+    for index1, coefficient1 in enumerate(vector1):
+        if not coefficient1:
+            continue
+
+        for index2, coefficient2 in enumerate(vector2):
+            result[index1 + index2] += coefficient1 * coefficient2
+
+    return result
+
+
+def karatsuba(vector1, vector2):
+    """
+    Multiply two lists of coefficients from the independent term, with
+    three products of the halves instead of four:
+        (a1 x^m + a0)(b1 x^m + b0) =
+            a1 b1 x^2m + ((a1 + a0)(b1 + b0) - a1 b1 - a0 b0) x^m + a0 b0
+    """
+    if len(vector1) > len(vector2):
+        vector1, vector2 = vector2, vector1
+
+    if len(vector1) < KARATSUBA_SIZE:
+        return schoolbook(vector1, vector2)
+
+    result = [0] * (len(vector1) + len(vector2) - 1)
+
+    if 2 * len(vector1) <= len(vector2):
+        # Very different sizes, the longer is multiplied by pieces
+        for start in range(0, len(vector2), len(vector1)):
+            product = karatsuba(vector1, vector2[start:start + len(vector1)])
+            for index, coefficient in enumerate(product):
+                result[start + index] += coefficient
+
+        return result
+
+    middle = len(vector2) // 2
+    low1, high1 = vector1[:middle], vector1[middle:]
+    low2, high2 = vector2[:middle], vector2[middle:]
+
+    low = karatsuba(low1, low2)
+    high = karatsuba(high1, high2)
+    mixed = karatsuba(add(low1, high1), add(low2, high2))
+
+    for index, coefficient in enumerate(low):
+        result[index] += coefficient
+        mixed[index] -= coefficient
+
+    for index, coefficient in enumerate(high):
+        result[index + 2 * middle] += coefficient
+        mixed[index] -= coefficient
+
+    for index, coefficient in enumerate(mixed):
+        if index + middle < len(result):
+            result[index + middle] += coefficient
+
+    return result
+
+
+def fft(vector1, vector2):
+    """
+    Multiply two lists of floats as a convolution, with the FFT of numpy.
+    The errors are relative to the greater coefficient of the product.
+    """
+    numpy = G.get_numpy()
+    size = len(vector1) + len(vector2) - 1
+    length = 1 << (size - 1).bit_length()  # A power of 2, the FFT is faster
+
+    result = numpy.fft.irfft(numpy.fft.rfft(vector1, length) *
+                             numpy.fft.rfft(vector2, length), length)
+
+    return result[:size].tolist()
+
+
+def trim(vector, tolerance=0):
+    """
+    Remove the greater coefficients that are zero, or less than tolerance
+    in absolute value.
+
+    >>> trim((0, 1e-12, 2, 0), 1e-9)
+    (2, 0)
+    """
+    for index, coefficient in enumerate(vector):
+        if abs(coefficient) > tolerance:
+            return tuple(vector[index:])
+
+    return (0,)
+
+
+def divide(vector1, vector2, tolerance=0):
+    """
+    Get the quotient and the remainder of the long division of two vectors,
+    in O(n m). The coefficients stay integers while they can be divided
+    exactly.
+
+    >>> divide((1, 0, -1), (1, -1))  # (x^2 - 1) / (x - 1)
+    ((1, 1), (0,))
+    >>> divide((2, 3, 4), (2, 1))
+    ((1, 1), (3,))
+    """
+    divisor = trim(vector2, tolerance)
+    if not divisor[0]:
+        raise ZeroDivisionError('polynomial division by zero')
+
+    remainder = list(trim(vector1, tolerance))
+    if len(remainder) < len(divisor):
+        return ((0,), tuple(remainder))
+
+    quotient = []
+    for index in range(len(remainder) - len(divisor) + 1):
+        coefficient = remainder[index]
+        if coefficient:
+            coefficient = divide_coefficient(coefficient, divisor[0])
+            for offset in range(1, len(divisor)):
+                remainder[index + offset] -= coefficient * divisor[offset]
+
+        quotient.append(coefficient)
+
+    remainder = remainder[len(quotient):]
+    return (tuple(quotient), trim(remainder, tolerance))
+
+
+def divide_coefficient(number1, number2):
+    # The integers stay exact when possible, and the fractions always
+    if type(number1) == Fraction or type(number2) == Fraction:
+        return number1 / number2
+
+    return arithmetic.divide(number1, number2)
+
+
+def synthetic_division(vector, root):
+    """
+    Divide a vector by (x - root) with the Ruffini's rule, in O(n). Get the
+    quotient and the remainder, that is the value of the vector in root.
+
+    >>> synthetic_division((1, -3, 2), 1)  # (x^2 - 3x + 2) / (x - 1)
+    ((1, -2), 0)
+    """
+    quotient = []
+    value = 0
+    for coefficient in vector:
+        value = value * root + coefficient
+        quotient.append(value)
+
+    remainder = quotient.pop()
+    return (tuple(quotient) or (0,), remainder)
+
+
+def gcd(vector1, vector2, tolerance=1e-9):
+    """
+    Get the monic greatest common divisor of two vectors, with the
+    Euclid's algorithm. For floats, the coefficients of the remainders
+    that are less than tolerance(relative to the dividend) are zeros.
+
+    >>> gcd((1, 0, -1), (1, 2, 1))  # x^2 - 1 and x^2 + 2x + 1
+    (1, 1)
+    """
+    vector1 = trim(vector1)
+    while True:
+        scale = max([abs(coefficient) for coefficient in vector1]) * tolerance
+        vector2 = trim(vector2, scale)
+        if not vector2[0]:
+            break
+
+        vector1, vector2 = vector2, divide(vector1, vector2, scale)[1]
+
+    if vector1 == (0,):
+        return vector1
+
+    return tuple([divide_coefficient(coefficient, vector1[0]) for coefficient in vector1])
+
+
+def derivative(vector):
+    """
+    >>> derivative((3, 4, 5))
+    (6, 4)
+    """
+    degree = len(vector) - 1
+    if not degree:
+        return (0,)
+
+    return tuple([coefficient * (degree - index) for index, coefficient in enumerate(vector[:-1])])
+
+
+def square_free(vector):
+    """
+    Split a vector in factors without repeated roots, dividing it by its
+    gcd with its derivative, that has the repeated roots once less. The
+    coefficients must be exact, like integers or Fractions.
+
+    >>> square_free((1, -1, -1, 1))  # (x - 1)^2 (x + 1)
+    [(1, 0, -1), (1, -1)]
+    """
+    vector = make_integers(vector)
+    factors = []
+    while len(vector) > 1:
+        divisor = gcd_integers(vector, derivative(vector))
+        quotient = divide([Fraction(coefficient) for coefficient in vector], divisor)[0]
+        factors.append(tuple([int(coefficient) for coefficient in quotient]))
+        vector = divisor
+
+    return factors
+
+
+def make_integers(vector):
+    """
+    Multiply a vector of exact coefficients by the lcm of their
+    denominators.
+
+    >>> make_integers((Fraction(1, 2), Fraction(1, 3)))
+    (3, 2)
+    """
+    denominators = [Fraction(coefficient).denominator for coefficient in vector]
+    scale = reduce(lambda a, b: a * b // fractions.gcd(a, b), denominators, 1)
+    return tuple([int(coefficient * scale) for coefficient in vector])
+
+
+def make_primitive(vector):
+    # Divided by the gcd of the coefficients, with a positive greater one
+    content = abs(reduce(fractions.gcd, vector))
+    if vector[0] < 0:
+        content = -content
+
+    return tuple([coefficient // content for coefficient in vector])
+
+
+def gcd_integers(vector1, vector2):
+    """
+    The gcd of two vectors of integers, with integer coefficients. Unlike
+    with fractions, the coefficients of the remainders don't grow because
+    each one is divided by the gcd of its coefficients.
+
+    >>> gcd_integers((1, 0, -1), (2, 4, 2))
+    (1, 1)
+    """
+    vector1 = make_primitive(trim(vector1))
+    vector2 = trim(vector2)
+    if len(vector1) < len(vector2):
+        vector1, vector2 = make_primitive(vector2), vector1
+
+    while vector2[0]:
+        vector2 = make_primitive(vector2)
+        vector1, vector2 = vector2, pseudo_remainder(vector1, vector2)
+
+    return vector1
+
+
+def pseudo_remainder(vector1, vector2):
+    """
+    The remainder of the division of vector1, multiplied by a power of the
+    greater coefficient of vector2, so there aren't fractions.
+    """
+    remainder = list(vector1)
+    lead = vector2[0]
+    for index in range(len(vector1) - len(vector2) + 1):
+        coefficient = remainder[index]
+        remainder = [number * lead for number in remainder]
+        for offset in range(len(vector2)):
+            remainder[index + offset] -= coefficient * vector2[offset]
+
+    return trim(remainder[len(vector1) - len(vector2) + 1:])
+
+
+def is_square_free(vector):
+    """
+    If a vector of exact coefficients hasn't repeated roots, so its gcd
+    with its derivative is a number. The gcd is calculated modulo a prime,
+    so the coefficients don't grow, and a bad prime only can make the gcd
+    greater.
+
+    >>> is_square_free((1, 0, -1)), is_square_free((1, -2, 1))
+    (True, False)
+    """
+    integers = make_integers(vector)
+    vector1 = trim([coefficient % PRIME for coefficient in integers])
+    vector2 = trim([coefficient % PRIME for coefficient in derivative(integers)])
+    if len(vector1) != len(integers):
+        return False  # The prime divides the greater coefficient
+
+    while vector2[0]:
+        vector1, vector2 = vector2, remainder_modulo(vector1, vector2, PRIME)
+
+    return len(vector1) == 1
+
+
+def remainder_modulo(vector1, vector2, prime):
+    remainder = list(vector1)
+    inverse = pow(vector2[0], prime - 2, prime)
+    for index in range(len(vector1) - len(vector2) + 1):
+        coefficient = remainder[index] * inverse % prime
+        if coefficient:
+            for offset in range(1, len(vector2)):
+                remainder[index + offset] = (remainder[index + offset] - coefficient * vector2[offset]) % prime
+
+    return trim(remainder[max(len(vector1) - len(vector2) + 1, 0):])
+
+
+def make_fraction(number, digits=None):
+    # The decimals of the floats as they are written: 0.1 --> 1/10
+    if type(number) == float:
+        return Fraction(repr(number) if digits is None else '%.*g' % (digits, number))
+
+    return Fraction(number)
+
+
+def roots(vector):
+    """
+    Get all the roots of a vector, the complex ones included, repeated by
+    their multiplicity. The real roots are floats, and go first.
+
+    The repeated roots can't be found precisely, so if there are, the
+    vector is split in factors without them first, with exact fractions of
+    the coefficients, or of their shown digits. The eigenvalues of the companion matrix of each factor are found with
+    numpy, or the Aberth's method is used without it, and then the roots
+    are polished with Newton's method. The multiple roots left by the
+    errors of the floats are joined, see join_roots.
+
+    >>> roots((1, 0, -4, 0))  # x(x - 2)(x + 2)
+    [2.0, 0.0, -2.0]
+    >>> roots((1, 0, 1))
+    [1j, -1j]
+    >>> roots((1, -3, 3, -1))  # (x - 1)^3
+    [1.0, 1.0, 1.0]
+    """
+    vector = trim(vector)
+
+    # The null roots, like in x^3 + x^2 = x^2(x + 1)
+    zeros = 0
+    while len(vector) > 1 and not vector[-1]:
+        vector = vector[:-1]
+        zeros += 1
+
+    # The floats of operations like (x - 0.3)^3 have errors in the last
+    # digits that hide the repeated roots, but not with the digits shown
+    exact = [make_fraction(coefficient) for coefficient in vector]
+    if is_square_free(exact):
+        rounded = [make_fraction(coefficient, ROOT_DIGITS) for coefficient in vector]
+        factors = [exact] if is_square_free(rounded) else square_free(rounded)
+    else:
+        factors = square_free(exact)
+
+    result = [0.0] * zeros
+    for factor in factors:
+        factor = [float(coefficient) for coefficient in factor]
+        result += join_roots(factor, find_roots(factor))
+
+    # The conjugated roots together, although their real parts differ a bit
+    return sorted(result, key=lambda root: (type(root) == complex, -round(root.real, 9), -root.imag))
+
+
+def find_roots(vector):
+    """
+    The roots of a vector of floats without repeated roots.
+    """
+    degree = len(vector) - 1
+    if degree == 0:
+        result = []
+
+    elif degree == 1:
+        result = [-vector[1] / vector[0]]
+
+    elif degree == 2:
+        result = solve_quadratic(*vector)
+
+    else:
+        numpy = G.get_numpy()
+        if numpy is not None:
+            result = numpy.roots(vector).tolist()
+        else:
+            result = aberth(vector)
+
+        result = [polish(vector, root) for root in result]
+
+    return [clean_root(root) for root in result]
+
+
+def join_roots(vector, roots):
+    """
+    Join the multiple roots that the errors of the coefficients split, like
+    (x - 1/3)^4 with floats, in a circle of roots around the true one.
+
+    A root c of multiplicity k moves at most about
+    (ROOT_ERROR * |p|(|c|) / |p^(k)(c) / k!|)^(1/k), so the groups of k
+    near roots inside of that circle are taken as k times their center,
+    found as the simple root of the (k - 1)th derivative.
+
+    >>> join_roots((1, -2, 1 + 1e-15), [1 + 3e-8j, 1 - 3e-8j])
+    [1.0, 1.0]
+    >>> join_roots((1, -2.0005, 1.0005), [1.0005, 1.0])
+    [1.0, 1.0005]
+    """
+    groups = []
+    for root in roots:
+        group = [root]
+        for other in groups[:]:
+            if any([abs(root - item) <= CLUSTER_DISTANCE * max(1.0, abs(root)) for item in other]):
+                group += other
+                groups.remove(other)
+
+        groups.append(group)
+
+    sizes = [abs(coefficient) for coefficient in vector]
+    result = []
+    for group in groups:
+        if len(group) == 1:
+            result += group
+            continue
+
+        center = sum(group) / len(group)
+
+        # taylor is p^(k)/k!, and previous is p^(k-1)/(k-1)!
+        taylor = vector
+        for step in range(1, len(group) + 1):
+            previous = taylor
+            taylor = [coefficient / float(step) for coefficient in derivative(taylor)]
+
+        value = abs(horner(taylor, center))
+        error = ROOT_ERROR * horner(sizes, abs(center))
+        if value and max([abs(root - center) for root in group]) <= 2 * (error / value) ** (1.0 / len(group)):
+            result += [clean_root(polish(previous, center))] * len(group)
+        else:
+            result += group
+
+    return result
+
+
+def solve_quadratic(a, b, c):
+    """
+    The roots of ax^2 + bx + c, without the cancellation of -b + sqrt(delta)
+    when b is big.
+    """
+    root = cmath.sqrt(b * b - 4 * a * c)
+    q = -(b + root) / 2.0 if b >= 0 else -(b - root) / 2.0
+
+    if not q:
+        return [0.0, 0.0]
+
+    return [q / a, c / q]
+
+
+def aberth(vector):
+    """
+    Find all the roots at once with the Aberth's method: each approximation
+    is moved by Newton's step, corrected by the repulsion of the others.
+    """
+    degree = len(vector) - 1
+
+    # The roots are inside of a circle of this radius (Fujiwara's bound)
+    radius = 2 * max([abs(vector[index] / vector[0]) ** (1.0 / index)
+                      for index in range(1, degree + 1)])
+
+    approximations = [radius * cmath.exp(1j * (2 * math.pi * index / degree + 0.4))
+                      for index in range(degree)]
+
+    # The values lower than the rounding error of the evaluation are zeros
+    sizes = [abs(coefficient) for coefficient in vector]
+    converged = [False] * degree
+
+    for iteration in range(ROOT_ITERATIONS):
+        for index, z in enumerate(approximations):
+            if converged[index]:
+                continue
+
+            value, derivative = horner_with_derivative(vector, z)
+            if abs(value) <= 4e-16 * horner(sizes, abs(z)):
+                converged[index] = True
+                continue
+
+            if not derivative:
+                derivative = 1e-12  # Push it out of the critical point
+
+            ratio = value / derivative
+            repulsion = sum([1.0 / (z - other) for other_index, other in enumerate(approximations)
+                             if other_index != index and z != other])
+
+            approximations[index] = z - ratio / (1 - ratio * repulsion)
+
+        if all(converged):
+            break
+
+    return approximations
+
+
+def polish(vector, root, steps=3):
+    """
+    Improve a root with some steps of Newton's method, while its value
+    gets lower.
+    """
+    value, derivative = horner_with_derivative(vector, root)
+    for step in range(steps):
+        if not value or not derivative:
+            break
+
+        new_root = root - value / derivative
+        new_value, new_derivative = horner_with_derivative(vector, new_root)
+        if abs(new_value) >= abs(value):
+            break
+
+        root, value, derivative = new_root, new_value, new_derivative
+
+    return root
+
+
+def clean_root(root, tolerance=1e-9):
+    """
+    Make a float of the roots with a negligible imaginary part, and remove
+    the negligible real part of the imaginary ones.
+    """
+    root = complex(root)
+    size = max(1.0, abs(root))
+
+    if abs(root.imag) <= tolerance * size:
+        return root.real + 0.0  # For evit -0.0
+
+    if abs(root.real) <= tolerance * size:
+        return complex(0.0, root.imag)
+
+    return root
@@ -0,0 +1,242 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Precedence climbing parser for numeric expressions.
+
+The tokens of the lexer are read once to build a tree, and the tree is
+evaluated in a single pass:
+
+>>> calculate('2 + 3 * 4')
+14
+>>> calculate('-2^2 + √9 + 3!')
+5.0
+"""
+
+import operator
+
+import lexer
+import globals as G
+
+
+NUMBER = 'number'
+VARIABLE = 'variable'
+NEGATIVE = 'neg'
+
+# Binding power of the operators, the greater binds first
+BINARY = {'+': 10,
+          '-': 10,
+          '*': 20,
+          '/': 20,
+          '%': 20,
+          '^': 40}
+
+RIGHT_ASSOCIATIVE = ['^']
+PREFIX = 30     # -x, binds less than ^, so -2^2 = -4
+FUNCTION = 40   # √x and sin(x), binds like ^, so √4^2 = (√4)^2
+POSTFIX = 50    # x!
+
+
+class Node(object):
+    """
+    A node of the tree, the leafs are numbers and variables:
+        '2 + 3x' = Node('+', [Node(NUMBER, 2), Node('*', [Node(NUMBER, 3), Node(VARIABLE, 'x')])])
+    """
+    __slots__ = ['operator', 'operands', 'value']
+
+    def __init__(self, operator, operands=(), value=None):
+        self.operator = operator
+        self.operands = operands
+        self.value = value
+
+    def __repr__(self):
+        if self.operator in [NUMBER, VARIABLE]:
+            return str(self.value)
+
+        return '(%s %s)' % (self.operator, ' '.join([repr(node) for node in self.operands]))
+
+
+class Parser(object):
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def parse(self):
+        node = self.parse_expression(0)
+        if self.index < len(self.tokens):
+            self.error()
+
+        return node
+
+    def error(self):
+        raise SyntaxError('Bad string, "%s"' % lexer.to_string(self.tokens))
+
+    def next(self):
+        if self.index == len(self.tokens):
+            self.error()
+
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def parse_expression(self, precedence):
+        node = self.parse_prefix()
+
+        while self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            if token.kind != lexer.OPERATOR:
+                self.error()
+
+            if token.value == '!':
+                self.index += 1
+                node = Node('!', (node,))
+                continue
+
+            power = BINARY.get(token.value)
+            if power is None or power <= precedence:
+                break
+
+            self.index += 1
+            if token.value in RIGHT_ASSOCIATIVE:
+                power -= 1
+
+            node = Node(token.value, (node, self.parse_expression(power)))
+
+        return node
+
+    def parse_prefix(self):
+        token = self.next()
+
+        if token.kind in [lexer.NUMBER, lexer.CONSTANT]:
+            return Node(NUMBER, value=token.value)
+
+        elif token.kind == lexer.VARIABLE:
+            return Node(VARIABLE, value=token.value)
+
+        elif token.kind == lexer.NAME:
+            if token.value not in OPERATIONS:
+                raise SyntaxError('Unknown name, "%s"' % token.text)
+
+            return Node(token.value, (self.parse_expression(FUNCTION),))
+
+        elif token.value == '(':
+            node = self.parse_expression(0)
+            if self.next().value != ')':
+                self.error()
+
+            return node
+
+        elif token.value == '-':
+            return Node(NEGATIVE, (self.parse_expression(PREFIX),))
+
+        elif token.value == '+':
+            return self.parse_expression(PREFIX)
+
+        elif token.value == G.SYMBOL_SQUARE_ROOT:
+            return Node(G.SYMBOL_SQUARE_ROOT, (self.parse_expression(FUNCTION),))
+
+        self.error()
+
+
+def divide(number1, number2):
+    # Keep the integers exact when possible, like 10/2 = 5
+    if type(number1) in [int, long] and type(number2) in [int, long] and number1 % number2 == 0:
+        return number1 // number2
+
+    return number1 / float(number2)
+
+
+def factorial(number):
+    if number < 0 or number != int(number):
+        raise ValueError('factorial() not defined for %s' % G.format_number(number))
+
+    return G.factorial(int(number)) if number else 1
+
+
+OPERATIONS = {'+': operator.add,
+              '-': operator.sub,
+              '*': operator.mul,
+              '/': divide,
+              '%': operator.mod,
+              '^': operator.pow,
+              NEGATIVE: operator.neg,
+              '!': factorial,
+              G.SYMBOL_SQUARE_ROOT: G.square_root,
+              'sin': G.sin,
+              'cos': G.cos,
+              'tan': G.tan,
+              'In': G.In,
+              'log': G.log,
+              'factorial': factorial}
+
+
+def parse(tokens):
+    """
+    Build the tree of a list of tokens, or of a string.
+    """
+    if type(tokens) != list:
+        tokens = lexer.tokenize(tokens)
+
+    return Parser(tokens).parse()
+
+
+def evaluate(node, variables={}, operations=OPERATIONS):
+    """
+    Evaluate the tree in a single pass. An explicit stack is used instead
+    of recursion, so long chains like '1+1+...+1' don't reach the recursion
+    limit.
+
+    The operations can be replaced, to evaluate the same tree with another
+    arithmetic.
+    """
+    values = []
+    pending = [(node, False)]
+
+    while pending:
+        node, ready = pending.pop()
+
+        if node.operator == NUMBER:
+            values.append(node.value)
+
+        elif node.operator == VARIABLE:
+            if node.value not in variables:
+                raise NameError('Unknown variable, "%s"' % node.value)
+
+            values.append(variables[node.value])
+
+        elif ready:
+            count = len(node.operands)
+            operands = values[-count:]
+            del values[-count:]
+            values.append(operations[node.operator](*operands))
+
+        else:
+            pending.append((node, True))
+            for operand in reversed(node.operands):
+                pending.append((operand, False))
+
+    return values[0]
+
+
+def calculate(data):
+    """
+    Parse and evaluate a string or a list of tokens without variables.
+    """
+    return evaluate(parse(data))
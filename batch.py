@@ -0,0 +1,324 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Calculate the expressions of a file, one by line, without the interface:
+
+    python -m batch exercises.txt -j 4 -f csv -o results.csv
+    cat exercises.txt | python -m batch
+
+The lines are calculated by a pool of processes, and the results are
+written in the order of the input, while it's read. Only a window of
+chunks is pending at once, so big files use a bounded memory. The errors
+are reported by line, and the exit status is 1 if any line failed.
+
+A line that takes more than --timeout seconds of processor, like 9^9^9, is
+stopped and reported as an error, the other lines are calculated anyway.
+"""
+
+import sys
+import csv
+import json
+import signal
+import argparse
+import multiprocessing
+from collections import deque
+
+from expressions import make_expression
+
+import profiling
+
+FORMATS = ['jsonl', 'csv']
+FIELDS = ['line', 'input', 'kind', 'result', 'error']
+
+CHUNK_SIZE = 64  # Lines by task
+WINDOW = 4  # Pending tasks by process
+TIMEOUT = 10  # Seconds by line
+
+
+def get_kind(expression):
+    if expression.is_function():
+        return 'function'
+
+    elif expression.is_equation():
+        return 'equation'
+
+    return 'polynomial'
+
+
+class LineTimeout(BaseException):
+    """
+    Raised by the timer of a line, it isn't an Exception so the calculation
+    doesn't catch it.
+    """
+
+
+def raise_timeout(signum, frame):
+    raise LineTimeout()
+
+
+def get_timeout_error(timeout):
+    return 'TimeoutError: more than %g seconds' % timeout
+
+
+def make_result(number, text, error=None):
+    return {'line': number,
+            'input': text,
+            'kind': None,
+            'result': None,
+            'error': error}
+
+
+def calculate_line(number, text, timeout=None):
+    """
+    Calculate a line, the errors are reported in the result instead of
+    being raised.
+
+    With a timeout, the line is stopped by a timer of the processor time of
+    this process, so the other processes don't count, where there is one
+    (setitimer is only in Unix).
+    """
+    result = make_result(number, text)
+    timer = timeout is not None and hasattr(signal, 'setitimer')
+    if timer:
+        signal.signal(signal.SIGPROF, raise_timeout)
+
+    try:
+        if timer:
+            signal.setitimer(signal.ITIMER_PROF, timeout)
+
+        expression = make_expression(text)
+        result['kind'] = get_kind(expression)
+        result['result'] = str(expression)
+
+    except LineTimeout:
+        result['error'] = get_timeout_error(timeout)
+
+    except Exception as error:
+        result['error'] = '%s: %s' % (type(error).__name__, error)
+
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+    return result
+
+
+def calculate_chunk(chunk, timeout=None):
+    return [calculate_line(number, text, timeout) for number, text in chunk]
+
+
+def read_chunks(lines, size=CHUNK_SIZE):
+    """
+    Group the lines that aren't empty in lists of (number, text).
+    """
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+
+        chunk.append((number, text))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def calculate_lines(lines, jobs=None, chunk_size=CHUNK_SIZE, timeout=TIMEOUT):
+    """
+    Iterate over the results of the lines, in order.
+
+    Without timeout and with a single job, the lines are calculated in this
+    process.
+    """
+    chunks = read_chunks(lines, chunk_size)
+
+    if jobs == 1 and timeout is None:
+        for chunk in chunks:
+            for result in calculate_chunk(chunk):
+                yield result
+
+        return
+
+    pool = Pool(jobs, timeout)
+    window = WINDOW * (jobs or multiprocessing.cpu_count())
+
+    try:
+        for chunk in chunks:
+            pool.add(chunk)
+            if len(pool) < window:
+                continue
+
+            for result in pool.get():
+                yield result
+
+        while len(pool):
+            for result in pool.get():
+                yield result
+
+    finally:
+        pool.terminate()
+
+
+class Pool(object):
+    """
+    The pending chunks of a pool of processes, that is made again when a
+    line takes too long.
+
+    Each line is stopped by its process after timeout seconds. If the timer
+    can't stop it, like inside of a long operation of C, the chunk isn't
+    ready after timeout seconds by line, so it's calculated again line by
+    line, and the lines that aren't ready in time are reported as errors.
+    """
+
+    def __init__(self, jobs=None, timeout=TIMEOUT):
+        self.jobs = jobs
+        self.timeout = timeout
+
+        # The processes share the processors if there are more
+        cpus = multiprocessing.cpu_count()
+        self.slowdown = max(1.0, float(jobs or cpus) / cpus)
+        self.pool = multiprocessing.Pool(jobs)
+        self.pending = deque()  # [(chunk, AsyncResult)]
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, chunk):
+        result = self.pool.apply_async(calculate_chunk, (chunk, self.timeout))
+        self.pending.append((chunk, result))
+
+    def get(self):
+        """
+        Get the results of the oldest chunk.
+        """
+        chunk, result = self.pending.popleft()
+        try:
+            return result.get(self.get_deadline(len(chunk)))
+        except multiprocessing.TimeoutError:
+            self.restart()
+
+        results = []
+        for number, text in chunk:
+            try:
+                result = self.pool.apply_async(calculate_line, (number, text, self.timeout))
+                results.append(result.get(self.get_deadline(1)))
+
+            except multiprocessing.TimeoutError:
+                error = get_timeout_error(self.timeout)
+                results.append(make_result(number, text, error))
+                self.restart()
+
+        # The chunks that weren't ready were stopped with the old processes
+        pending = self.pending
+        self.pending = deque()
+        for chunk, result in pending:
+            if result.ready():
+                self.pending.append((chunk, result))
+            else:
+                self.add(chunk)
+
+        return results
+
+    def get_deadline(self, lines):
+        # The timers of the lines stop them before, this is the last resort
+        if self.timeout is None:
+            return None
+
+        return self.timeout * (lines + 1) * self.slowdown
+
+    def restart(self):
+        self.terminate()
+        self.pool = multiprocessing.Pool(self.jobs)
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+class JSONLWriter(object):
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        self.stream.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+class CSVWriter(object):
+
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, FIELDS)
+        self.writer.writeheader()
+
+    def write(self, result):
+        self.writer.writerow(result)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m batch',
+        description='Calculate the expressions of a file, one by line.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with an expression by line, - for stdin')
+    parser.add_argument('-o', '--output', default='-',
+                        help='file for the results, - for stdout')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes, all the CPUs by default')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='lines sent to a process at once')
+    parser.add_argument('-t', '--timeout', type=float, default=TIMEOUT,
+                        help='seconds of processor by line before it is stopped, 0 for no limit')
+    options = parser.parse_args(args)
+
+    profiling.enable_from_environment()
+    if profiling.is_enabled():
+        # The stages of other processes aren't collected
+        options.jobs = 1
+        options.timeout = 0
+
+    timeout = options.timeout or None
+
+    input_file = sys.stdin if options.input == '-' else open(options.input)
+    output_file = sys.stdout if options.output == '-' else open(options.output, 'w')
+    writer = (JSONLWriter if options.format == 'jsonl' else CSVWriter)(output_file)
+
+    errors = 0
+    try:
+        for result in calculate_lines(input_file, options.jobs, options.chunk_size, timeout):
+            writer.write(result)
+            if result['error'] is not None:
+                errors += 1
+
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
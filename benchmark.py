@@ -0,0 +1,226 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Benchmarks of the expressions and of the graph:
+
+    python benchmark.py -o before.json
+    python benchmark.py -c before.json
+
+Each benchmark is run some times in a loop, and the time of a call is
+measured for each repetition. The minimum, the median and the 95th
+percentile are shown, and can be saved as JSON to compare two runs.
+
+The graph benchmarks draw a GraphArea on a cairo.ImageSurface, they are
+skipped if GTK or cairo are not available.
+"""
+
+import gc
+import json
+import time
+import platform
+import argparse
+from collections import OrderedDict
+
+from expressions import Monomial
+from expressions import Polynomial
+from expressions import Equation
+from expressions import Function
+
+import globals as G
+
+REPEAT = 20
+ZOOMS = [20, 50, 200]  # Values of GraphArea.unit_space
+WIDTH = 800
+HEIGHT = 600
+
+POLYNOMIAL = '3x^5 - 2x^4 + 7x^3 - x^2 + 4x - 9'
+FUNCTION = 'f(x) = x^3 - 3x^2 + 2x - 1'
+NUMERIC = '2(3 + 4)^2 - √81 ÷ 3 + 5! - 10 % 4'
+
+
+def measure(function, number, repeat=REPEAT):
+    """
+    Get the time of a call of function in each repetition, in seconds.
+    """
+    times = []
+    gc.disable()  # The collector makes the times less stable
+    try:
+        for n in range(repeat):
+            start = time.time()
+            for i in range(number):
+                function()
+
+            times.append((time.time() - start) / number)
+
+    finally:
+        gc.enable()
+
+    return times
+
+
+def get_stats(times):
+    times = sorted(times)
+    middle = len(times) // 2
+    if len(times) % 2:
+        median = times[middle]
+    else:
+        median = (times[middle - 1] + times[middle]) / 2.0
+
+    return {'min': times[0],
+            'median': median,
+            'p95': times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+            'repeat': len(times)}
+
+
+def chain_polynomials():
+    polynomial = Polynomial(POLYNOMIAL)
+    for degree in range(20):
+        polynomial = polynomial + Polynomial({degree: degree + 1}) - Polynomial({0: degree})
+
+    return polynomial
+
+
+def make_benchmarks():
+    """
+    The list of (name, function, number of calls by repetition).
+    """
+    function = Function(FUNCTION)
+    xs = [x / 10.0 for x in range(-500, 500)]
+
+    benchmarks = [
+        ('monomial parse', lambda: Monomial('-7x^3'), 2000),
+        ('polynomial parse', lambda: Polynomial(POLYNOMIAL), 500),
+        ('polynomial chain', chain_polynomials, 50),
+        ('equation solve degree 1', lambda: Equation('3x + 4 = x - 2').solve(), 500),
+        ('equation solve degree 2', lambda: Equation('x^2 - 5x + 6 = 0').solve(), 500),
+        ('function call x1000', lambda: [function(x) for x in xs], 20),
+        ('simplify', lambda: G.simplify(NUMERIC), 1000),
+    ]
+
+    return benchmarks + make_graph_benchmarks()
+
+
+def make_graph_benchmarks():
+    try:
+        import cairo
+        from graph import GraphArea
+
+    except ImportError:
+        return []
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+    benchmarks = []
+
+    for zoom in ZOOMS:
+        area = GraphArea([FUNCTION, 'f(x) = 2x + 1', 'f(x) = x^-1'])
+        area.width = WIDTH
+        area.height = HEIGHT
+        area.unit_space = zoom
+        area.font_size = zoom / 2.0
+        area.context = cairo.Context(surface)
+
+        def render(area=area):
+            # Without the cached background and paths
+            area.background = None
+            area.paths = {}
+            area.render()
+
+        benchmarks.append(('graph render zoom %d' % zoom, render, 5))
+        benchmarks.append(('graph render cached zoom %d' % zoom, area.render, 20))
+
+        def render_intervals(area=area):
+            area.interval_mode = True
+            render(area)
+            area.interval_mode = False
+
+        benchmarks.append(('graph render intervals zoom %d' % zoom, render_intervals, 5))
+
+    return benchmarks
+
+
+def format_time(seconds):
+    for unit, factor in [('s', 1), ('ms', 1e3), ('us', 1e6)]:
+        if seconds * factor >= 1:
+            return '%.3f %s' % (seconds * factor, unit)
+
+    return '%.3f ns' % (seconds * 1e9)
+
+
+def run(names=None, repeat=REPEAT):
+    results = OrderedDict()
+    for name, function, number in make_benchmarks():
+        if names and not [n for n in names if n in name]:
+            continue
+
+        function()  # Warm up the caches
+        results[name] = get_stats(measure(function, number, repeat))
+
+    return results
+
+
+def show(results, previous=None):
+    width = max([len(name) for name in results] + [10])
+    header = '%-*s %12s %12s %12s' % (width, 'benchmark', 'min', 'median', 'p95')
+    if previous:
+        header += ' %9s' % 'change'
+
+    print(header)
+    for name in results:
+        stats = results[name]
+        line = '%-*s %12s %12s %12s' % (width, name, format_time(stats['min']),
+                                        format_time(stats['median']),
+                                        format_time(stats['p95']))
+
+        if previous and name in previous:
+            # Change of the median, negative is faster
+            line += ' %+8.1f%%' % ((stats['median'] / previous[name]['median'] - 1) * 100)
+
+        print(line)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the calculator.')
+    parser.add_argument('names', nargs='*',
+                        help='run only the benchmarks with these words')
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT)
+    parser.add_argument('-o', '--output', help='save the results as JSON')
+    parser.add_argument('-c', '--compare', help='compare with saved results')
+    options = parser.parse_args(args)
+
+    previous = None
+    if options.compare:
+        with open(options.compare) as file:
+            previous = json.load(file)['results']
+
+    results = run(options.names, options.repeat)
+    show(results, previous)
+
+    if options.output:
+        data = {'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'results': results}
+
+        with open(options.output, 'w') as file:
+            json.dump(data, file, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
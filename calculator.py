@@ -18,17 +18,24 @@
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
 import os
+import time
+
+START_TIME = time.time()  # To measure the time until the first frame
 
 from gi.repository import Gtk
 from gi.repository import Gdk
 
-from expressions import Expression
+from worker import Worker
+from worker import report_error
+
+import profiling
 
 from widgets import Entry
-from widgets import GraphManager
-from widgets import ButtonSimple
-from widgets import ButtonOperator
-from widgets import ButtonSpecial
+from widgets import Stack
+from widgets import Keypad
+from widgets import STYLE_SIMPLE
+from widgets import STYLE_OPERATOR
+from widgets import STYLE_SPECIAL
 
 import globals as G
 
@@ -40,14 +47,17 @@ class Calculator(Gtk.Window):
 
         self.set_title('Calculator')
 
+        self.worker = Worker()
+
         self.vbox = Gtk.VBox()
         self.vbox.set_border_width(10)
 
         self.entry = Entry()
         self.entry.connect('activate', self.calculate)
+        self.entry.connect('cancel', lambda entry: self.worker.cancel())
         self.vbox.pack_start(self.entry, False, False, 0)
 
-        self.stack = Gtk.Stack()
+        self.stack = Stack()
         self.stack.set_transition_type(
             Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
         self.stack.set_transition_duration(1000)
@@ -62,54 +72,57 @@ class Calculator(Gtk.Window):
         self.make_buttons()
 
         self.connect('destroy', Gtk.main_quit)
+        self.__first_draw_id = self.connect_after('draw', self.__first_draw_cb)
 
         self.add(self.vbox)
         self.show_all()
 
+    def __first_draw_cb(self, window, context):
+        self.disconnect(self.__first_draw_id)
+        profiling.record('calculator.first_frame', time.time() - START_TIME)
+
     def calculate(self, entry):
-        if not self.entry.get_text():
+        text = self.entry.get_text()
+        if not text:
             return
 
-        expression = Expression(self.entry.get_text())
-        string = str(expression)
-        self.entry.set_text('0' + string if string[0] == '.' else string)
+        self.entry.set_busy(True)
+        self.worker.calculate(text, self.calculate_cb)
+
+    def calculate_cb(self, text, expression, error):
+        self.entry.set_busy(False)
+        if error is not None:
+            report_error(text, error)
+            return  # The text of the user is kept
+
+        result = str(expression)
+        self.entry.set_text('0' + result if result[0] == '.' else result)
 
         if expression.is_function():
+            self.stack.make_page('graph')
             self.grapher.add_function(expression.obj)
 
     def make_buttons(self):
-        grid = Gtk.Grid()
-        self.stack.add_titled(grid, 'simple', 'Simple')
-
-        text = self.entry.get_text()
         buttons = [['7', '8', '9'],
                    ['4', '5', '6'],
                    ['1', '2', '3'],
                    ['.', '0', '=']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSimple)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
+        keypad = self.make_keypad(buttons, STYLE_SIMPLE)
+        self.stack.add_titled(keypad, 'simple', 'Simple')
 
-            n_row += 1
+        # A column of operators, at the right of the numbers
+        operators = [G.SYMBOL_DEL] + G.OPERATORS
+        height = float(len(buttons)) / len(operators)
+        for n, operator in enumerate(operators):
+            keypad.add_key(operator, 3, n * height, 1, height, STYLE_OPERATOR)
 
-        self.vbox_operators = Gtk.VBox()
-        grid.attach(self.vbox_operators, 4, 0, 1, 4)
-
-        button = self.make_button(G.SYMBOL_DEL, _class=ButtonOperator)
-        self.vbox_operators.add(button)
-
-        for operator in G.OPERATORS:
-            button = self.make_button(operator, _class=ButtonOperator)
-            self.vbox_operators.add(button)
+        self.stack.add_lazy_titled(self.make_complex_page, 'complex', 'Complex')
+        self.stack.add_lazy_titled(self.make_graph_page, 'graph', 'Graph')
 
+    def make_complex_page(self, box):
         hbox = Gtk.HBox()
-        self.stack.add_titled(hbox, 'complex', 'Complex')
+        box.pack_start(hbox, True, True, 0)
 
         stack = Gtk.Stack()
         stack.set_transition_type(Gtk.StackTransitionType.SLIDE_UP_DOWN)
@@ -121,42 +134,18 @@ class Calculator(Gtk.Window):
         hbox.pack_start(stack, True, True, 0)
         hbox.pack_end(stack_switcher, False, False, 10)
 
-        grid = Gtk.Grid()
-        stack.add_titled(grid, 'first', '')
-
         buttons = [['sen', 'cos', 'tan', 'In'],
                    ['log', '!', 'PI', 'e'],
                    ['^', '(', ')', G.SYMBOL_SQUARE_ROOT],
                    ['%', 'x', 'y', 'f(x) = ']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSpecial)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
-
-            n_row += 1
-
-        grid = Gtk.Grid()
-        stack.add_titled(grid, 'second', '')
+        stack.add_titled(self.make_keypad(buttons, STYLE_SPECIAL), 'first', '')
 
         buttons = [['A', 'B', 'C'],
                    ['D', 'E', 'F'],
                    ['Dec', 'Hex', 'Bin']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSpecial)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
-
-            n_row += 1
+        stack.add_titled(self.make_keypad(buttons, STYLE_SPECIAL), 'second', '')
 
         button1, button2 = stack_switcher.get_children()
         stack_switcher.remove(button1)
@@ -169,23 +158,27 @@ class Calculator(Gtk.Window):
         buttonbox.add(button1)
         buttonbox.add(button2)
 
-        self.grapher = GraphManager()
+    def make_graph_page(self, box):
+        from graph import GraphManager  # Only needed for plotting
 
-        vbox = Gtk.VBox()
-        vbox.add(self.grapher)
+        if profiling.is_enabled():
+            profiling.enable()  # Measure the graph too
 
-        self.stack.add_titled(vbox, 'graph', 'Graph')
+        self.grapher = GraphManager()
+        box.add(self.grapher)
 
-    def make_button(self, label, _class=None):
-        button = _class(label) if _class else Gtk.Button(label)
-        button.set_hexpand(True)
-        button.set_vexpand(True)
+    def make_keypad(self, rows, style):
+        keypad = Keypad(rows, style)
+        keypad.set_hexpand(True)
+        keypad.set_vexpand(True)
+        keypad.connect('activate-key', self.__key_activated_cb)
+        return keypad
 
+    def __key_activated_cb(self, keypad, label):
         if label in ['sen', 'cos', 'tan', 'In', 'log']:
             label += '()'
 
-        button.connect('clicked', self.insert_from_button, label)
-        return button
+        self.insert_from_button(keypad, label)
 
     def insert_from_button(self, button, label):
         if label != G.SYMBOL_DEL:
@@ -209,6 +202,7 @@ def load_theme():
 
 
 if __name__ == '__main__':
+    profiling.enable_from_environment()
     load_theme()
     Calculator()
     Gtk.main()
@@ -17,9 +17,28 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+import copy
+from collections import OrderedDict
+
+import algebra
+import arithmetic
+import intervals
+import lexer
 import globals as G
 
 
+NAMESPACE = G.make_namespace()
+CACHE_SIZE = 256
+TOLERANCE = 1e-9  # Relative, for the remainders of the divisions with floats
+
+# The monomials that can be interned, {(coefficient, degree): Monomial}, only
+# with int coefficients. They are created the first time that are used.
+INTERNED_MONOMIALS = {}
+for coefficient in range(-16, 17):
+    for degree in range(0, 9):
+        INTERNED_MONOMIALS[(coefficient, degree)] = None
+
+
 class Infinity(object):
     def __init__(self, symbol=G.SYMBOL_INFINITY):
 
@@ -96,7 +115,8 @@ class Infinity(object):
 
 class Monomial(object):
     """
-    A simple monomial
+    A simple monomial, an immutable pair of a signed coefficient and a
+    degree.
 
     >>> m = Monomial('4x')
     >>> m
@@ -128,279 +148,168 @@ class Monomial(object):
     >>> bool(m)
     False
     """
-    def __init__(self, data):
+    __slots__ = ['coefficient', 'degree', '__repr']
 
-        self.parse_string(data)
-
-    def parse_string(self, data):
+    def __new__(cls, data='', degree=None):
         """
-        Get all data from the string.
-
-        For example, if the data is '2x^4':
-            coefficient = 2
-            degree = 4
-            literal_part = x^4
-            sign = '+'
-        """
-        data = data.replace('**', '^')
-        data = data.replace(' ', '')
-        _repr = None
-
-        if 'x^' in data:
-            coefficient = data.split('x')[0].split('+')[-1]
-            if not coefficient:
-                self.coefficient = 1
-
-            else:
-                if coefficient in ['+', '-']:
-                    self.sign = coefficient
-                    self.coefficient = eval(self.sign + '1')
-
-                else:
-                    sign = coefficient[0] if coefficient[0] in ['+', '-'] else '+'
-                    coefficient = coefficient[1:] if coefficient[0] in ['+', '-'] else coefficient
-                    try:
-                        self.coefficient = float(sign + coefficient)
-                    except:
-                        self.coefficient = 0
-                        _repr = data
-
-            try:
-                self.degree = float(data.split('^')[1].split('+')[0])
-            except:
-                self.degree = 0
-
-            self.literal_part = 'x^' + str(self.degree)
-
-        elif 'x' in data and not '^' in data:
-            _degree = None
-            _literal_part = None
-            if '*' in data:
-                data1, data2 = data.split('*')
-                if not 'x' in data1:
-                    coefficient = data1
+        Make a monomial from a string, or from a signed coefficient and a
+        degree without parsing any string: Monomial(-3, 2) is '-3x^2'
 
-                elif not 'x' in data2:
-                    coefficient = data2
+        The common monomials (integer coefficients and small degrees, like
+        x, 1, 0 or x^2) are interned, so they are created only once.
 
-                elif data1.strip() == 'x' and data2.strip() == 'x':
-                    data = 'x^2'
-                    coefficient = '1'
-                    _degree = 2
-                    _literal_part = 'x ^ 2'
+        >>> Monomial(2.0, 0).coefficient, Monomial(2, 0).coefficient
+        (2.0, 2)
+        """
+        if degree is None:
+            data, degree = parse_monomial(data)
 
-            else:
-                coefficient = data.split('x')[0]
+        if not data:
+            data = 0
+            degree = 0
 
-            if coefficient and coefficient[0] in ['+', '-']:
-                sign = coefficient[0]
-                coefficient = coefficient[1:]
+        elif degree == int(degree):
+            degree = int(degree)  # For evit 2.0 in degrees
 
-            else:
-                sign = '+'
+        key = (data, degree)
+        interned = type(data) == int and key in INTERNED_MONOMIALS  # Not 2.0
+        if interned and INTERNED_MONOMIALS[key] is not None:
+            return INTERNED_MONOMIALS[key]
 
-            if coefficient and coefficient.isalnum():
-                self.coefficient = float(sign + coefficient)
+        monomial = object.__new__(cls)
+        object.__setattr__(monomial, 'coefficient', data)
+        object.__setattr__(monomial, 'degree', degree)
 
-            else:
-                self.coefficient = float(sign + '1')
+        if interned:
+            INTERNED_MONOMIALS[key] = monomial
 
-            self.degree = 1 if _degree is None else _degree
-            self.literal_part = 'x' if _literal_part is None else _literal_part
+        return monomial
 
-        elif not 'x' in data:
-            _repr = str(data)
-            data = G.clean_string(data)
+    def __setattr__(self, name, value):
+        raise AttributeError('Monomial objects are immutable')
 
-            try:
-                self.coefficient = float(eval(data))
-            except:
-                self.coefficient = 0
-
-            self.degree = 0
-            self.literal_part = ''
+    def __reduce__(self):
+        return (Monomial, (self.coefficient, self.degree))
 
-        if self.coefficient < 0:
-            self.coefficient = abs(self.coefficient)
-            self.sign = '-'
+    @property
+    def sign(self):
+        return '-' if self.coefficient < 0 else '+'
 
-        elif self.coefficient >= 0:
-            self.sign = '+'
+    @property
+    def literal_part(self):
+        if self.degree == 0:
+            return ''
 
-        if not _repr:
-            self.repr = '%s%d%s' % (self.sign, self.coefficient, self.literal_part)
-            if self.repr.startswith('+0x'):
-                self.repr = '0'
-                self.coefficient = 0
-                self.literal_part = ''
-                self.sign = '+'
+        elif self.degree == 1:
+            return 'x'
 
-        else:
-            self.repr = _repr
+        return 'x^' + G.format_number(self.degree)
 
-        if self.repr.startswith('.'):
-            self.repr = '0' + self.repr
+    @property
+    def repr(self):
+        """
+        The representation with sign, like '+3x^2'. It's only made the
+        first time that is used.
+        """
+        try:
+            return self.__repr
+        except AttributeError:
+            _repr = self.sign + G.format_number(abs(self.coefficient)) + self.literal_part
+            object.__setattr__(self, '_Monomial__repr', _repr)
+            return _repr
+
+    def get_coefficient(self):
+        """
+        The coefficient with its sign.
+        """
+        return self.coefficient
 
     def __str__(self):
         return self.repr[1:] if self.repr.startswith('+') else self.repr
 
     def __eq__(self, monomial):
-        if type(monomial) in [str, int]:
+        if type(monomial) in [str, int, long, float]:
             monomial = Monomial(str(monomial))
 
         if type(monomial) != Monomial:
             return False
 
-        return self.repr == monomial.repr
+        return self.coefficient == monomial.coefficient and self.degree == monomial.degree
 
     def __ne__(self, monomial):
         return not self == monomial
 
+    def __hash__(self):
+        return hash((self.coefficient, self.degree))
+
     def __pos__(self):
-        return Monomial(self.repr.replace('-', '+'))
+        return Monomial(abs(self.coefficient), self.degree)
 
     def __neg__(self):
-        return Monomial(self.repr.replace('+', '-'))
+        return Monomial(-self.coefficient, self.degree)
 
     def __add__(self, monomial):
-        if type(monomial) in [str, int]:
+        if type(monomial) in [str, int, long, float]:
             monomial = Monomial(str(monomial))
 
+        if type(monomial) == Polynomial:
+            return monomial + self
+
         if type(monomial) != Monomial:
             raise TypeError("cannot concatenate 'Monomial' + %s objects" % str(type(monomial))[6:-1])
 
-        if self.degree == monomial.degree:
-            coefficient1 = self.coefficient
-            coefficient2 = monomial.coefficient
-            if self.sign == '-':
-                coefficient1 *= -1
-
-            if monomial.sign == '-':
-                coefficient2 *= -1
-
-            if self.degree == 0:
-                return Monomial(str(coefficient1 + coefficient2))
+        if self.degree == monomial.degree or not monomial:
+            return Monomial(self.coefficient + monomial.coefficient, self.degree)
 
-            elif self.degree == 1:
-                return Monomial(str(coefficient1 + coefficient2) + 'x')
+        elif not self:
+            return monomial
 
-            else:
-                return Monomial(str(coefficient1 + coefficient2) + 'x^' + str(self.degree))
-
-        else:
-            if self.degree > monomial.degree:
-                sign = '-' if self.sign == '-' else ''
-                data = sign + str(self.coefficient) + self.literal_part + monomial.sign + str(monomial.coefficient) + monomial.literal_part
-                return Polynomial(data)
-
-            elif self.degree < monomial.degree:
-                if self:
-                    sign = self.sign if self.repr[0] not in ['+', '-'] else ''
-                    data = monomial.repr + sign + self.repr
-                    return Polynomial(data)
-
-                else:
-                    return Monomial(monomial.repr)
+        return Polynomial({self.degree: self.coefficient,
+                           monomial.degree: monomial.coefficient})
 
     def __sub__(self, monomial):
-        if type(monomial) == Monomial:
-            monomial = monomial.repr
-
-        elif type(monomial) == int:
-            monomial = str(monomial)
+        if type(monomial) in [str, int, long, float]:
+            monomial = Monomial(str(monomial))
 
-        elif type(monomial) != str:
+        elif type(monomial) not in [Monomial, Polynomial]:
             raise TypeError("unsupported operand type(s) for -: 'Monomial' and %s" % str(type(monomial))[6:-1])
 
-        if monomial.startswith('+'):
-            monomial = monomial[1:]
-
-        _repr = self.repr + '-%s' % monomial
-        if Monomial(monomial).degree == self.degree:
-            polynomial = Polynomial(_repr)
-            return Monomial(polynomial.repr)
-
-        else:
-            return Polynomial(_repr)
+        return self + (-monomial)
 
     def __mul__(self, monomial):
-        if type(monomial) in [str, int]:
+        if type(monomial) in [str, int, long, float]:
             monomial = Monomial(str(monomial))
 
         coefficient = monomial.coefficient * self.coefficient
-        degree = monomial.degree + self.degree
-        if degree == 0:
-            return Monomial(str(coefficient))
-
-        elif degree == 1:
-            return Monomial(str(coefficient) + 'x')
-
-        else:
-            return Monomial(str(coefficient) + 'x^' + str(degree))
+        return Monomial(coefficient, monomial.degree + self.degree)
 
     def __div__(self, monomial):
-        if type(monomial) in [str, int]:
+        if type(monomial) in [str, int, long, float]:
             monomial = Monomial(str(monomial))
 
-        degree = self.degree - monomial.degree
-        if monomial.coefficient == self.coefficient:
-            if degree == 1:
-                return Monomial('x')
-
-            else:
-                return Monomial('x^%d' % degree)
-
-        elif self.coefficient == 1 and monomial.coefficient != 1:
-            if degree == 1:
-                _monomial = '(x)'
-
-            else:
-                _monomial = '(x^%d)' % degree
-
-            _monomial += '/%d' % monomial.coefficient
-            return Monomial(_monomial)
-
-        else:
-            coefficient = self.coefficient / monomial.coefficient
-            if degree == 1:
-                _coefficient = str(coefficient) if coefficient != 1 else ''
-                return Monomial('%sx' % _coefficient)
-
-            elif degree == 0:
-                return Monomial(coefficient)
-
-            else:
-                return Monomial('%dx^%d' % (coefficient, degree))
+        coefficient = self.coefficient / float(monomial.coefficient)
+        return Monomial(coefficient, self.degree - monomial.degree)
 
     def __pow__(self, other):
         if type(other) != int:
             raise TypeError("unsupported operand type(s) for ** or pow(): 'Monomial' and %s" % str(type(other))[6:-1])
 
-        if self.degree == 0:
-            return Monomial(str(float(self.repr) ** other))
-
-        elif self.degree == 1:
-            return Monomial(self.repr + '^' + str(other))
-
-        else:
-            degree = self.degree ** other
-            _repr = self.repr.split('^')[0] + '^' + str(degree)
-            return Monomial(_repr)
+        return Monomial(self.coefficient ** other, self.degree * other)
 
     def __and__(self, monomial):
         if type(monomial) == str:
             monomial = Monomial(monomial)
 
-        return self.repr.strip() != '0' and monomial.repr.strip() != '0'
+        return bool(self) and bool(monomial)
 
     def __or__(self, monomial):
         if type(monomial) == str:
             monomial = Monomial(monomial)
 
-        return self.repr.strip() != '0' or monomial.repr.strip() != '0'
+        return bool(self) or bool(monomial)
 
     def __nonzero__(self):
-        return self.repr not in ['-0', '0', '+0']
+        return bool(self.coefficient)
 
     def __repr__(self):
         _repr = self.repr
@@ -436,7 +345,7 @@ class Polynomial(object):
     3x^2 + 8x + 5
 
     >>> p + '-2x^2'
-    1x^2 + 4x + 25
+    x^2 + 4x + 25
 
     >>> # Compare polynomials
     >>> p1 = Polynomial('3x^2 + 4x + 5')  # Create using a string
@@ -458,159 +367,169 @@ class Polynomial(object):
     """
     def __init__(self, data):
 
-        if type(data) == int:
-            data = str(data)
+        self.coefficients = {}  # {degree: coefficient}
+        self.max_degree = 0
+        self.__vector = False
+        self.__monomials = None
+        self.__repr = None
+
+        if type(data) in [int, long, float]:
+            data = {0: data}
+
+        elif type(data) == Monomial:
+            data = {data.degree: data.coefficient}
 
         if type(data) == str:
             self.parse_string(data)
 
+        elif type(data) == list:
+            self.set_coefficients(parse_polynomial(data))
+
         elif type(data) == dict:
-            self.monomials = data
-            self.parse_dict()
+            self.parse_dict(data)
 
     def parse_string(self, data):
         """
         Transform a string to a understandable dictionary
         Example:
-            '3x^2 + 4x + 5' = {0: ['5'], 1: ['4x'], 2: ['3x^2']}
-            '2x' = {1: ['2x']}
-            '10x^14 + 5x^6 - 3x^2' = {2: ['-3x^2'], 6: ['5x^6'], 14: ['10x^14']}
+            '3x^2 + 4x + 5' = {0: 5, 1: 4, 2: 3}
+            '2x' = {1: 2}
+            '10x^14 + 5x^6 - 3x^2' = {2: -3, 6: 5, 14: 10}
         """
-        self.max_degree = 0
-        if not data or not data.replace('0', '') or (data[0] in ['+', '-'] and not data[1:].replace('0', '')):
-            self.monomials = {}
-            self.degrees = []
-            self.repr = '0'
-            return
+        self.set_coefficients(parse_polynomial(lexer.tokenize(data)))
 
-        order = [' ', '^+', '^-', '+', '-', 'DEGREE_POS', 'DEGREE_SUB']
-        replaces = {' ': '',
-                    '^+': 'DEGREE_POS',
-                    '^-': 'DEGREE_SUB',
-                    '+': 'SPLIT+',
-                    '-': 'SPLIT-',
-                    'DEGREE_POS': '^+',
-                    'DEGREE_SUB': '^-'}
-
-        for find in order:
-            data = data.replace(find, replaces[find])
-
-        _monomials = data.split('SPLIT')
-        monomials = []
-        for monomial in _monomials:
-            if monomial in ['0', '+0', '-0']:
-                continue
-
-            monomials.append(monomial)
-
-        self.monomials = {}
-
-        for monomial in monomials:
-            monomial = Monomial(monomial)
-            if monomial in ['+0', '-0', '0']:
+    def parse_dict(self, data):
+        """
+        Get the coefficients from a dictionary, the values can be numbers
+        or lists of monomials(as strings or Monomial instances).
+        Example:
+            {0: ['5'], 1: ['4x'], 2: ['3x^2']} = {0: 5, 1: 4, 2: 3}
+        """
+        coefficients = {}
+        for degree, value in data.items():
+            if type(value) not in [list, tuple]:
+                coefficients[degree] = coefficients.get(degree, 0) + value
                 continue
 
-            if not monomial.degree in self.monomials:
-                if monomial.degree == int(monomial.degree):
-                    monomial.degree = int(monomial.degree)  # For evit 2.0 in degrees
+            for monomial in value:
+                if type(monomial) != Monomial:
+                    monomial = Monomial(str(monomial))
 
-                self.monomials[monomial.degree] = []
+                coefficients[monomial.degree] = coefficients.get(monomial.degree, 0) + monomial.coefficient
 
-            self.monomials[monomial.degree].append(monomial)
+        self.set_coefficients(coefficients)
 
-        # Good orderer of monomials by her degree
-        degrees = []
-        for degree in self.monomials.keys():
-            degrees.append(degree)
+    def set_coefficients(self, coefficients):
+        """
+        Set the canonical state of the polynomial, monomials with a null
+        coefficient are discarded.
+        """
+        self.coefficients = {}
+        self.max_degree = 0
+        self.__vector = False
+        self.__monomials = None
+        self.__repr = None
 
-        _dict = {}
-        _list = []
+        for degree, coefficient in coefficients.items():
+            if not coefficient:
+                continue
 
-        for value in degrees:
-            if not abs(value) in _dict:
-                _dict[abs(value)] = []
+            if degree == int(degree):
+                degree = int(degree)  # For evit 2.0 in degrees
 
-            _dict[abs(value)].append(value)
+            self.coefficients[degree] = coefficient
+            if abs(degree) > self.max_degree:
+                self.max_degree = abs(degree)
 
-        _degrees = _dict.keys()
-        degrees = []
-        for degree in _degrees:
-            degrees.append(degree)
+    def get_degrees(self):
+        """
+        The degrees of the polynomial, ordered by absolute value and then
+        by value, from the greater.
+        """
+        return sorted(self.coefficients.keys(), key=lambda degree: (abs(degree), degree), reverse=True)
 
-        degrees.sort()
-        degrees.reverse()
-        for degree in degrees:
-            list = _dict[degree]
-            list.sort()
-            list.reverse()
+    def get_max_degree(self):
+        return self.max_degree
 
-            for value in list:
-                _list.append(value)
+    def evaluate(self, x):
+        """
+        The value of the polynomial in x.
+        """
+        if self.vector is not None:
+            return algebra.horner(self.vector, x)
 
-        degrees = _list
+        result = 0.0
+        for degree, coefficient in self.coefficients.items():
+            result += coefficient * x ** degree
 
-        # Making the representation by the orderer monomials
-        self.repr = ''
-        for degree in degrees:
-            _monomial = None
-            for monomial in self.monomials[degree]:
-                if not _monomial:
-                    _monomial = monomial
+        return result
 
-                else:
-                    _monomial += monomial
+    def evaluate_with_derivative(self, x):
+        """
+        The value of the polynomial and of its derivative in x.
+        """
+        if self.vector is not None:
+            return algebra.horner_with_derivative(self.vector, x)
 
-            _repr = _monomial.repr
-            if not _repr.startswith('+') and not _repr.startswith('-'):
-                _repr = '+' + _repr
+        result = 0.0
+        derivative = 0.0
+        for degree, coefficient in self.coefficients.items():
+            result += coefficient * x ** degree
+            if degree:
+                derivative += degree * coefficient * x ** (degree - 1)
 
-            order = ['^+', '^-', '+', '-', ' + 0', 'DEGREE_POS', 'DEGREE_SUB']
-            replaces = {'^+': 'DEGREE_POS',
-                        '^-': 'DEGREE_SUB',
-                        '+': ' + ',
-                        '-': ' - ',
-                        ' + 0': '',
-                        'DEGREE_POS': '^+',
-                        'DEGREE_SUB': '^-'}
+        return (result, derivative)
 
-            for find in order:
-                _repr = _repr.replace(find, replaces[find])
+    def get_coefficient(self, degree):
+        return self.coefficients.get(degree, 0)
 
-            self.repr += _repr
-            if abs(degree) > self.max_degree:
-                self.max_degree = abs(degree)
+    @property
+    def vector(self):
+        """
+        The dense vector of floats, for the evaluation with the Horner's
+        method. It's only made the first time that is used, and it's None
+        if the polynomial must be evaluated monomial by monomial(negative,
+        fractional or very sparse degrees, or huge coefficients).
+        """
+        if self.__vector is False:
+            self.__vector = algebra.make_vector(self.coefficients)
 
-        if self.repr.startswith(' + '):
-            self.repr = self.repr[3:]  # 3 = len(' + ')
+        return self.__vector
 
-        if self.repr.startswith(' - '):
-            self.repr = '-' + self.repr[3:]
+    @property
+    def monomials(self):
+        """
+        The monomials grouped by degree: {degree: [Monomial]}
+        """
+        if self.__monomials is None:
+            self.__monomials = {}
+            for degree, coefficient in self.coefficients.items():
+                self.__monomials[degree] = [Monomial(coefficient, degree)]
 
-        if not self.repr:
-            self.repr = '0'
+        return self.__monomials
 
-    def parse_dict(self):
+    @property
+    def repr(self):
         """
-        Transform a dictionary to string(invert process of parse_string).
+        Making the representation by the orderer monomials. It's only made
+        the first time that is used, the arithmetic doesn't need it.
         """
-        self.repr = ''
-        for monomial in self:
-            self.repr += monomial.sign + monomial.repr
+        if self.__repr is not None:
+            return self.__repr
 
-        self.repr = self.repr.replace('+', ' + ')
-        self.repr = self.repr.replace('-', ' - ')
-        self.repr = self.repr.replace(' + 0', '')
+        _repr = ''
+        for degree in self.get_degrees():
+            monomial = self.monomials[degree][0]
+            _repr += ' %s %s' % (monomial.sign, repr(monomial).lstrip('-'))
 
-        if self.repr.startswith(' + '):
-            self.repr = self.repr[3:]  # 3 = len(' + ')
+        if _repr.startswith(' + '):
+            _repr = _repr[3:]  # 3 = len(' + ')
 
-        if self.repr.startswith(' - '):
-            self.repr = '-' + self.repr[3:]
+        elif _repr.startswith(' - '):
+            _repr = '-' + _repr[3:]
 
-        self.parse_string(self.repr)  # For when use string and not use Monomial
-
-    def get_max_degree(self):
-        return self.max_degree
+        self.__repr = _repr or '0'
+        return self.__repr
 
     def __repr__(self):
         return self.repr
@@ -619,82 +538,352 @@ class Polynomial(object):
         return self.repr
 
     def __add__(self, polynomial):
-        if not self.repr.startswith('+') and not self.repr.startswith('-'):
-            self.repr = '+' + self.repr
+        polynomial = make_polynomial(polynomial, '+')
 
-        if type(polynomial) == int:
-            polynomial = str(polynomial)
+        coefficients = dict(self.coefficients)
+        for degree, coefficient in polynomial.coefficients.items():
+            coefficients[degree] = coefficients.get(degree, 0) + coefficient
 
-        if type(polynomial) == str:
-            if polynomial and not polynomial[0] in ['+', '-']:
-                polynomial = '+ ' + polynomial
+        return Polynomial(coefficients)
 
-            return self + Polynomial(polynomial)
+    def __radd__(self, polynomial):
+        return self + polynomial
 
-        elif type(polynomial) in [Polynomial, Monomial]:
-            if polynomial.repr and not polynomial.repr[0] in ['+', '-']:
-                polynomial.repr = '+ ' + polynomial.repr
+    def __sub__(self, polynomial):
+        return self + (-make_polynomial(polynomial, '-'))
 
-            return Polynomial(self.repr + polynomial.repr)
+    def __rsub__(self, polynomial):
+        return make_polynomial(polynomial, '-') + (-self)
 
-    def __sub__(self, polynomial):
-        if type(polynomial) in [Monomial, Polynomial]:
-            polynomial = polynomial.repr
+    def __neg__(self):
+        coefficients = {}
+        for degree, coefficient in self.coefficients.items():
+            coefficients[degree] = -coefficient
 
-        elif type(polynomial) == int:
-            polynomial = str(polynomial)
+        return Polynomial(coefficients)
 
-        elif type(polynomial) != str:
-            raise TypeError("unsupported operand type(s) for -: 'Polynomial' and %s" % str(type(polynomial))[6:-1])
+    def __mul__(self, polynomial):
+        """
+        >>> Polynomial('x + 1') * Polynomial('x - 1')
+        x^2 - 1
+        """
+        polynomial = make_polynomial(polynomial, '*')
 
-        if polynomial and polynomial[0] not in ['+', '-']:
-            polynomial = '+' + polynomial
+        vector1 = algebra.make_vector(self.coefficients, exact=True)
+        vector2 = algebra.make_vector(polynomial.coefficients, exact=True)
+        if vector1 is not None and vector2 is not None:
+            return Polynomial(algebra.make_coefficients(algebra.multiply(vector1, vector2)))
 
-        polynomial = polynomial.replace('-', 'ADD')
-        polynomial = polynomial.replace('+', 'SUB')
-        polynomial = polynomial.replace('ADD', '+')
-        polynomial = polynomial.replace('SUB', '-')
+        # Negative or fractional degrees, monomial by monomial
+        coefficients = {}
+        for degree1, coefficient1 in self.coefficients.items():
+            for degree2, coefficient2 in polynomial.coefficients.items():
+                degree = degree1 + degree2
+                coefficients[degree] = coefficients.get(degree, 0) + coefficient1 * coefficient2
 
-        return Polynomial(self.repr + polynomial)
+        return Polynomial(coefficients)
 
-    def __neg__(self):
-        polynomial = self.repr
-        polynomial = polynomial.replace(' ', '')
-        polynomial = polynomial.replace('-', 'ADD')
-        polynomial = polynomial.replace('+', 'SUB')
-        polynomial = polynomial.replace('ADD', '+')
-        polynomial = polynomial.replace('SUB', '-')
-        if polynomial and polynomial[0] not in ['-', '+']:
-            polynomial = '-' + polynomial
-
-        p = Polynomial(polynomial)
-        return Polynomial
+    def __rmul__(self, polynomial):
+        return self * polynomial
+
+    def __div__(self, polynomial):
+        """
+        Divide by a number, or by a polynomial that divides it exactly.
+
+        >>> Polynomial('x^2 - 1') / Polynomial('x + 1')
+        x - 1
+        """
+        if type(polynomial) in [int, long, float]:
+            return Polynomial(dict([(degree, arithmetic.divide(coefficient, polynomial))
+                                    for degree, coefficient in self.coefficients.items()]))
+
+        quotient, remainder = divmod(self, polynomial)
+        if remainder:
+            raise ValueError('"%s" is not divisible by "%s"' % (self.repr, make_polynomial(polynomial, '/').repr))
+
+        return quotient
+
+    def __divmod__(self, polynomial):
+        """
+        The quotient and the remainder of the long division.
+
+        >>> divmod(Polynomial('2x^2 + 3x + 4'), Polynomial('2x + 1'))
+        (x + 1, 3)
+        """
+        polynomial = make_polynomial(polynomial, 'divmod()')
+
+        vector1 = algebra.make_vector(self.coefficients, exact=True, sparse=True)
+        vector2 = algebra.make_vector(polynomial.coefficients, exact=True, sparse=True)
+        if vector1 is None or vector2 is None:
+            raise ValueError('Only polynomials with natural degrees can be divided')
+
+        tolerance = max([abs(coefficient) for coefficient in vector1]) * TOLERANCE
+        quotient, remainder = algebra.divide(vector1, vector2, tolerance)
+        return (Polynomial(algebra.make_coefficients(quotient)),
+                Polynomial(algebra.make_coefficients(remainder)))
+
+    def __floordiv__(self, polynomial):
+        return divmod(self, polynomial)[0]
+
+    def __mod__(self, polynomial):
+        return divmod(self, polynomial)[1]
+
+    def gcd(self, polynomial):
+        """
+        The monic greatest common divisor of two polynomials.
+
+        >>> Polynomial('x^2 - 1').gcd('x^2 + 2x + 1')
+        x + 1
+        """
+        polynomial = make_polynomial(polynomial, 'gcd()')
+
+        vector1 = algebra.make_vector(self.coefficients, exact=True, sparse=True)
+        vector2 = algebra.make_vector(polynomial.coefficients, exact=True, sparse=True)
+        if vector1 is None or vector2 is None:
+            raise ValueError('Only polynomials with natural degrees have a gcd')
+
+        return Polynomial(algebra.make_coefficients(algebra.gcd(vector1, vector2, TOLERANCE)))
+
+    def __pow__(self, exponent):
+        """
+        >>> Polynomial('x + 1') ** 3
+        x^3 + 3x^2 + 3x + 1
+        """
+        if type(exponent) == float and exponent == int(exponent):
+            exponent = int(exponent)
+
+        if type(exponent) != int:
+            raise TypeError("unsupported operand type(s) for ** or pow(): 'Polynomial' and %s" % str(type(exponent))[6:-1])
+
+        if len(self.coefficients) == 1:
+            # A monomial, any exponent is valid
+            for degree, coefficient in self.coefficients.items():
+                return Polynomial({degree * exponent: coefficient ** exponent})
+
+        if exponent < 0:
+            raise ValueError('Only natural powers of polynomials, "(%s)^%d"' % (self.repr, exponent))
+
+        vector = algebra.make_vector(self.coefficients, exact=True)
+        if vector is not None:
+            return Polynomial(algebra.make_coefficients(algebra.power(vector, exponent)))
+
+        # Sparse, negative or fractional degrees, by squaring
+        result = Polynomial(1)
+        base = self
+        while exponent:
+            if exponent % 2:
+                result = result * base
+
+            exponent //= 2
+            if exponent:
+                base = base * base
+
+        return result
 
     def __eq__(self, polynomial):
         if type(polynomial) != Polynomial:
             return False
 
-        return self.repr == polynomial.repr
+        return self.coefficients == polynomial.coefficients
+
+    def __ne__(self, polynomial):
+        return not self == polynomial
+
+    def __hash__(self):
+        return hash(frozenset(self.coefficients.items()))
 
     def __nonzero__(self):
-        return bool(self.monomials)
+        return bool(self.coefficients)
 
     def __iter__(self):
-        degrees = []
-        for degree in self.monomials.keys():
-            degrees.append(degree)
-
-        degrees.sort()
-        degrees.reverse()
-        for degree in degrees:
+        for degree in sorted(self.coefficients.keys(), reverse=True):
             for monomial in self.monomials[degree]:
-                if type(monomial) == str:
-                    monomial = Monomial(monomial)
+                yield monomial
 
-                if monomial.repr.strip() in ['0', '+0', '-0']:
-                    continue
 
-                yield monomial
+def parse_monomial(data):
+    """
+    Get the signed coefficient and the degree of a string.
+
+    For example, if the data is '-2x^4': (-2, 4)
+    """
+    coefficients = parse_terms(lexer.tokenize(data))
+    if len(coefficients) > 1:
+        raise SyntaxError('Bad monomial, "%s"' % data)
+
+    for degree, coefficient in coefficients.items():
+        return (coefficient, degree)
+
+    return (0, 0)
+
+
+def parse_polynomial(tokens):
+    """
+    Get the coefficients of a list of tokens. The sums of monomials are read
+    directly, and other expressions, like '(x + 1)^2', are expanded with the
+    arithmetic of the polynomials.
+
+    >>> parse_polynomial(lexer.tokenize('x^2^3 + 2^3^2 x'))
+    {8: 1, 1: 512}
+    """
+    try:
+        return parse_terms(tokens)
+    except SyntaxError:
+        pass
+
+    try:
+        result = arithmetic.evaluate(arithmetic.parse(tokens), VARIABLES, POLYNOMIAL_OPERATIONS)
+    except (TypeError, NameError):
+        raise SyntaxError('Bad polynomial, "%s"' % lexer.to_string(tokens))
+
+    return make_polynomial(result).coefficients
+
+
+def parse_terms(tokens):
+    """
+    Get the coefficients of the monomials of a list of tokens, summing the
+    coefficients of the same degree.
+    Example:
+        '3x^2 + 4x + 10 - 5' = {0: 5, 1: 4, 2: 3}
+        '3 * x / x^3' = {-2: 3}
+    """
+    coefficients = {}
+    sign = 1
+    coefficient = 1
+    degree = 0
+    factor = None  # The last factor: (number, divided) or (None, divided) for x
+    divided = False
+    index = 0
+
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+
+        if token.kind in [lexer.NUMBER, lexer.CONSTANT, lexer.VARIABLE] and \
+                index > 1 and tokens[index - 2].kind != lexer.OPERATOR:
+            # Two factors without an operator, like '2 3x'
+            raise SyntaxError('Bad polynomial, "%s"' % lexer.to_string(tokens))
+
+        if token.kind in [lexer.NUMBER, lexer.CONSTANT]:
+            coefficient = arithmetic.divide(coefficient, token.value) if divided else coefficient * token.value
+            factor = (token.value, divided)
+            divided = False
+
+        elif token.kind == lexer.VARIABLE and token.value == 'x':
+            degree += -1 if divided else 1
+            factor = (None, divided)
+            divided = False
+
+        elif token.kind != lexer.OPERATOR or divided:
+            raise SyntaxError('Bad polynomial, "%s"' % lexer.to_string(tokens))
+
+        elif token.value in ['+', '-']:
+            if factor is not None:
+                coefficients[degree] = coefficients.get(degree, 0) + sign * coefficient
+                sign = 1
+                coefficient = 1
+                degree = 0
+                factor = None
+
+            if token.value == '-':
+                sign *= -1
+
+        elif token.value == '/' and factor is not None:
+            divided = True
+
+        elif token.value == '^' and factor is not None:
+            exponent_sign = 1
+            while index < len(tokens) and tokens[index].value in ['+', '-']:
+                exponent_sign *= -1 if tokens[index].value == '-' else 1
+                index += 1
+
+            if index == len(tokens) or tokens[index].kind not in [lexer.NUMBER, lexer.CONSTANT]:
+                raise SyntaxError('Bad exponent, "%s"' % lexer.to_string(tokens))
+
+            exponent = exponent_sign * tokens[index].value
+            index += 1
+
+            if index < len(tokens) and tokens[index].value == '^':
+                # x^2^3 is x^(2^3), arithmetic.parse reads it from the right
+                raise SyntaxError('Chained exponents, "%s"' % lexer.to_string(tokens))
+
+            number, _divided = factor
+            if _divided:
+                exponent = -exponent
+
+            if number is None:
+                degree += exponent - (-1 if _divided else 1)
+
+            elif type(exponent) in [int, long] and type(number) in [int, long] and \
+                    type(coefficient) in [int, long]:
+                # Exact for the integers, like 2^70 or x / 2^70, 0^2 leaves it in 0
+                if number:
+                    coefficient = coefficient * number if _divided else coefficient // number
+                    if exponent >= 0:
+                        coefficient *= number ** exponent
+                    else:
+                        coefficient = arithmetic.divide(coefficient, number ** -exponent)
+
+            else:
+                # Replace the last factor of the coefficient by its power
+                number = float(number)
+                coefficient = coefficient * number ** exponent * (number if _divided else 1 / number)
+
+        elif token.value != '*' or factor is None:
+            raise SyntaxError('Bad polynomial, "%s"' % lexer.to_string(tokens))
+
+    if divided:
+        raise SyntaxError('Bad polynomial, "%s"' % lexer.to_string(tokens))
+
+    if factor is not None:
+        coefficients[degree] = coefficients.get(degree, 0) + sign * coefficient
+
+    return coefficients
+
+
+def make_polynomial(data, operator='+'):
+    """
+    Get a Polynomial from a polynomial, a monomial, a string or a number.
+    """
+    if type(data) == Polynomial:
+        return data
+
+    if type(data) in [str, int, long, float, Monomial, list]:
+        return Polynomial(data)
+
+    raise TypeError("unsupported operand type(s) for %s: 'Polynomial' and %s" % (operator, str(type(data))[6:-1]))
+
+
+def divide_polynomials(a, b):
+    if Polynomial in [type(a), type(b)]:
+        return make_polynomial(a, '/') / b
+
+    return arithmetic.divide(a, b)
+
+
+# The tree of an expression with x is evaluated with polynomials
+VARIABLES = {'x': Polynomial({1: 1})}
+POLYNOMIAL_OPERATIONS = dict(arithmetic.OPERATIONS)
+POLYNOMIAL_OPERATIONS['/'] = divide_polynomials
+
+
+def format_root(root):
+    """
+    >>> format_root(2.0), format_root(-1.5 + 2j), format_root(-1j)
+    ('2', '-1.5 + 2i', '-i')
+    """
+    if type(root) != complex:
+        return G.format_number(root)
+
+    imaginary = 'i' if abs(root.imag) == 1 else G.format_number(abs(root.imag)) + 'i'
+    if not root.real:
+        return ('-' if root.imag < 0 else '') + imaginary
+
+    return '%s %s %s' % (G.format_number(root.real), '-' if root.imag < 0 else '+', imaginary)
+
+
+def format_roots(roots):
+    return '; '.join([format_root(root) for root in roots])
 
 
 class Equation(object):
@@ -724,21 +913,29 @@ class Equation(object):
             # General expresion: ax = b
             >>> e = Equation('5x + 8 = 100')
             >>> e.solve()
-            {92/5} = {18.4}
+            (18.4,)
+            >>> e.repr_solution
+            '{92/5} = {18.4}'
 
-            >>> e = Ecuation('2x + 10')
+            >>> e = Equation('2x + 10')
             >>> e.solve()
-            {10/2} = {5}
+            (-5.0,)
 
         2° degree:
             1° Case:
                 >>> e = Equation('x^2 -9x + 8 = 0')
                 >>> e.solve()
-                {(8, 1)}
+                (8.0, 1.0)
 
             2° Case:
-            3° Case:
-            4° Case:
+                >>> e = Equation('x^2 + 4 = 0')
+                >>> e.solve()
+                (2j, -2j)
+
+        n° degree:
+            >>> e = Equation('x^4 = 1')
+            >>> e.solve()
+            (1.0, -1.0, 1j, -1j)
 
     """
     def __init__(self, data):
@@ -748,68 +945,45 @@ class Equation(object):
         self.parse_data(data)
 
     def parse_data(self, data):
-        # Get a string for both polynomials
+        # Get both polynomials
         if type(data) == str:
-            if '=' in data:
-                data = data.split('=')
-
-            else:
-                data = (data, '0')
-
-        elif type(data) in [Polynomial, Monomial]:
-            data = (data.repr, '0')
-
-        if type(data) in [tuple, list] and len(data) == 2:
-            polynomial1, polynomial2 = data
-
-            if type(polynomial1) in [Polynomial, Monomial]:
-                polynomial1 = polynomial1.repr.replace(' ', '')
-
-            elif type(polynomial1) == int:
-                polynomial = str(polynomial1)
-
-            elif type(polynomial1) != str:
-                # 'error', polynomial1
-                pass
-
-            if type(polynomial2) in [Polynomial, Monomial]:
-                polynomial2 = polynomial2.repr.replace(' ', '')
-
-            elif type(polynomial2) == int:
-                polynomial = str(polynomial2)
+            data = lexer.tokenize(data)
 
-            elif type(polynomial2) != str:
-                # 'error', polynomial2
-                pass
+        if type(data) in [Polynomial, Monomial, int, long, float]:
+            data = (data, 0)
 
-        # Convert two polynomials in one
-        if polynomial2.strip() != '0':
-            polynomial2 = polynomial2.replace('-', 'ADD')
-            polynomial2 = polynomial2.replace('+', 'SUB')
-            polynomial2 = polynomial2.replace('ADD', '+')
-            polynomial2 = polynomial2.replace('SUB', '-')
+        elif type(data) == list and (not data or type(data[0]) == lexer.Token):
+            data = lexer.split(data, '=')
+            if len(data) == 1:
+                data.append(0)
 
-            if polynomial2 and polynomial2[0] not in ['+', '-']:
-                polynomial2 = '-' + polynomial2
+        if type(data) not in [tuple, list] or len(data) != 2:
+            raise SyntaxError('Bad equation, "%s"' % str(data))
 
-            polynomial1 += polynomial2
-
-        # Make a Polynomial instance for futures operations
-        self.polynomial = Polynomial(polynomial1)
+        # Convert two polynomials in one, and make a Polynomial instance for
+        # futures operations
+        polynomial1, polynomial2 = data
+        self.polynomial = make_polynomial(polynomial1) - make_polynomial(polynomial2)
         self.repr = self.polynomial.repr + ' = 0'
         self.degree = self.polynomial.get_max_degree()
 
     def solve(self):
         """
-        Gets the degree of the equation and select the appropriate resolution
+        Gets the degree of the equation and select the appropriate resolution.
+        The solution is the tuple of all the roots, the complex ones and the
+        repeated ones included, or None if it can't be solved.
+
+        >>> Equation('x^3 = 4x').solve()
+        (2.0, 0.0, -2.0)
+        >>> Equation('x^2 + 1 = 0').solve()
+        (1j, -1j)
+        >>> Equation('x^3 - 3x^2 + 3x - 1 = 0').solve()
+        (1.0, 1.0, 1.0)
         """
-        if self.degree == 1:
+        if self.degree == 1 and self.polynomial.vector is not None:
             return self.__solve_with_1_degree_methods()
 
-        elif self.degree == 2:
-            return self.__solve_with_2_degree_methods()
-
-        return None
+        return self.__solve_with_n_degree_methods()
 
     def __solve_with_1_degree_methods(self):
         """
@@ -822,116 +996,38 @@ class Equation(object):
             x = 4
             S = {4}
         """
-        polynomial = self.polynomial.repr.replace(' ', '')
-        polynomial = polynomial.replace('+', 'SPLIT+')
-        polynomial = polynomial.replace('-', 'SPLIT-')
-        monomials = []
-        _monomials = polynomial.split('SPLIT')
-        for monomial in _monomials:
-            if monomial:
-                monomials.append(monomial)
-
-        monomial1, monomial2 = monomials
-        monomial1 = Monomial(monomial1)
-        monomial2 = Monomial(monomial2)
-        solution = '{'
-
-        coefficient1 = str(float(monomial1.coefficient))
-        coefficient2 = str(float(monomial2.coefficient))
-        sign1 = monomial1.sign
-        sign2 = '+' if monomial2.sign == '-' else '-'
-
-        if sign1 != sign2:  # For signs rule
-            if sign1 == '-':
-                coefficient1 = '-' + coefficient1
-
-            if sign2 == '-':
-                coefficient2 = '-' + coefficient2
-
-        if coefficient1.endswith('.0'):
-            coefficient1 = coefficient1[:-2]
-
-        if coefficient2.endswith('.0'):
-            coefficient2 = coefficient2[:-2]
-
-        r = str(float(coefficient2) / float(coefficient1)).split('.')
-        r = r[0] + '.' + r[1]
-        if len(r.split('.')[1]) > 2:
-            other_solution = ''
-
-        else:
-            if r.endswith('.0'):
-                r = r[:-2]
-
-            other_solution = ' = {%s}' % (r)
+        coefficient1 = self.polynomial.get_coefficient(1)
+        coefficient2 = -self.polynomial.get_coefficient(0)
+        solution = coefficient2 / float(coefficient1)
 
-        solution += coefficient2 + '/' + coefficient1 + '}' + other_solution
-        self.repr_solution = solution
-        return float(self.repr_solution.split(' = ')[1].replace('{', '').replace('}', ''))
+        self.repr_solution = '{%s/%s} = {%s}' % (G.format_number(coefficient2),
+                                                 G.format_number(coefficient1),
+                                                 G.format_number(solution))
+        return (solution,)
 
-    def __solve_with_2_degree_methods(self):
+    def __solve_with_n_degree_methods(self):
         """
-        Quadratic equation
+        All the roots at once, by algebra.roots. The negative degrees are
+        removed multiplying by a power of x:
+            x + 2 - 3x^-1 = 0  -->  x^2 + 2x - 3 = 0
         """
-        monomials = self.polynomial.monomials
-        if 0 in monomials and 1 in monomials and 2 in monomials:
-            # Is a complete second degree equation, apply bhaskaras and get
-            # two values
-            # Example of a cuadratic complete equation:
-            #   x^2 -9x + 8 = 0
-
-            a = float('%s%d' % (monomials[2][0].sign, monomials[2][0].coefficient))
-            b = float('%s%d' % (monomials[1][0].sign, monomials[1][0].coefficient))
-            c = float('%s%d' % (monomials[0][0].sign, monomials[0][0].coefficient))
-            delta = (b ** 2) - (4 * a * c)
-
-            if delta < 0:
-                # Is impossible to calculate the square root of a
-                # negative number, empty solution.
-                self.repr_solution = 'Ø'
-
-            # Calculating square root without 'math' module
-            root = G.square_root(delta)
-            x1 = (-b + root) / (2 * a)  # Positive root
-            x2 = (-b - root) / (2 * a)  # Negative root
-            self.repr_solution = '{(%f; %f)}' % (float(x1), float(x2))
-            return (float(x1), float(x2))
-
-        # Incomplete equations
-        elif 0 not in monomials and 1 not in monomials and 2 in monomials:
-            # 2x^2 = 0
-            self.repr_solution = '{(0, 0)}'
-            return (0, 0)
-
-        elif 0 not in monomials and 1 in monomials and 2 in monomials:
-            # x^2 - 5x = 0
-            # x(x - 5) = 0
-            # Case 1:
-            #   x = 0
-            # Case 2:
-            #   x - 5 = 0
-            #   x = 5
-            monomial = monomials[1][0]
-            x1 = 0
-            x2 = -float('%s%f' % (monomial.sign, monomial.coefficient))
-            self.solution_repr = '%d; %d' % (x1, x2)
-            return (x1, x2)
-
-        elif 0 in monomials and 1 not in monomials and 2 in monomials:
-            # 2x^2 - 2 = 0
-            # 2x^2 = 2
-            # x^2 = 1
-            # x1 = 1
-            # x2 = -1
-            monomial1 = monomials[2][0]
-            monomial2 = monomials[0][0]
-
-            number = abs(monomial2.coefficient / monomial1.coefficient)
-            root = G.square_root(number)
-            self.solution_repr = '{(%f, %f)}' % (float(root), float(-root))
-            return (root, -root)
-
-        return None
+        coefficients = self.polynomial.coefficients
+        if not coefficients:
+            return None  # 0 = 0, all the numbers
+
+        shift = -min(min(coefficients), 0)
+        vector = algebra.make_vector(dict([(degree + shift, coefficient)
+                                           for degree, coefficient in coefficients.items()]),
+                                     exact=True, sparse=True)
+        if vector is None:
+            return None  # Fractional degrees
+
+        try:
+            solution = tuple(algebra.roots(vector))
+        except OverflowError:
+            return None  # Coefficients too big for the floats
+        self.repr_solution = '{%s}' % format_roots(solution)
+        return solution
 
     def __repr__(self):
         return self.repr
@@ -940,75 +1036,153 @@ class Equation(object):
 class Function(object):
     def __init__(self, polynomial):
 
-        if type(polynomial) == Monomial:
-            polynomial = polynomial.repr
-
         if type(polynomial) == str:
-            if polynomial.startswith('f(x) = '):
-                polynomial = polynomial[7:]
+            polynomial = lexer.tokenize(polynomial)
+
+        if type(polynomial) == list:
+            # Remove 'f(x) =' and 'y ='
+            polynomial = lexer.split(polynomial, '=')[-1]
+
+        self.polynomial = make_polynomial(polynomial)
+        self.repr = 'f(x) = %s' % self.polynomial.repr
+        self.degree = self.polynomial.get_max_degree()
+        self.color = (0, 0, 1)
+        self.vector = self.polynomial.vector
+        self.terms = []  # [(coefficient, degree), ...]
+        self.evaluator = None
 
-            elif polynomial.startswith('f(x)='):
-                polynomial = polynomial[5:]
+        self.independent_term = self.polynomial.get_coefficient(0)
 
-            elif polynomial.startswith('y = '):
-                polynomial = polynomial[4:]
+        self.compile()
 
-            elif polynomial.startswith('y='):
-                polynomial = polynomial[2:]
+    def compile(self):
+        """
+        Build the evaluator once, so calling the function only costs the
+        arithmetic of its monomials instead of a parse and an eval.
 
-            _repr = polynomial
-            self.polynomial = Polynomial(polynomial)
+        It's used when the polynomial hasn't a dense vector(negative,
+        fractional or very sparse degrees), else the Horner's method is
+        faster.
 
-        elif type(polynomial) == Polynomial:
-            _repr = polynomial.repr
-            self.polynomial = polynomial
+        Example:
+            '3x^2 + 4x + 5' --> lambda x: 3.0 * x ** 2 + 4.0 * x + 5.0
+        """
+        self.terms = []
+        terms = []
+        for monomial in self.polynomial:
+            try:
+                coefficient = float(monomial.coefficient)
+            except OverflowError:
+                coefficient = monomial.coefficient  # Too big for a float, kept exact
 
-        self.repr = 'f(x) = %s' % _repr
-        self.degree = self.polynomial.get_max_degree()
-        self.independent_term = 0
-        self.color = (0, 0, 1)
+            self.terms.append((coefficient, monomial.degree))
+
+            if monomial.degree == 0:
+                terms.append('%r' % coefficient)
 
-        if 0 in self.polynomial.monomials:
-            monomial = self.polynomial.monomials[0][0]
-            self.independent_term = monomial.coefficient
-            if monomial.sign == '-':
-                self.independent_term *= -1
+            elif monomial.degree == 1:
+                terms.append('%r * x' % coefficient)
+
+            else:
+                terms.append('%r * x ** %r' % (coefficient, monomial.degree))
+
+        source = 'lambda x: ' + (' + '.join(terms) if terms else '0.0')
+        self.evaluator = eval(compile(source, '<%s>' % self.repr, 'eval'), NAMESPACE)
+
+    def evaluate_with_derivative(self, value):
+        """
+        Get f(x) and f'(x) in the same pass.
+
+        >>> f = Function('f(x) = 3x^2 + 4x + 5')
+        >>> f.evaluate_with_derivative(2)
+        (25.0, 16.0)
+        """
+        return self.polynomial.evaluate_with_derivative(float(value))
+
+    def evaluate_many(self, xs):
+        """
+        Evaluate the function for all the values of xs in one pass.
+
+        With numpy the Horner's method(or every monomial) is applied to the
+        whole array, so the cost is one array operation per coefficient
+        instead of one call per value. Without numpy the function is called
+        for each value.
+
+        >>> f = Function('f(x) = 2x + 1')
+        >>> list(f.evaluate_many([0, 1, 2]))
+        [1.0, 3.0, 5.0]
+        """
+        numpy = G.get_numpy()
+        if numpy is None:
+            return [self(x) for x in xs]
+
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.zeros(xs.shape)
+
+        # The values out of the domain, like x^0.5 for x < 0, are nan or
+        # inf without a warning for each redraw
+        with numpy.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            if self.vector is not None:
+                for coefficient in self.vector:
+                    ys *= xs
+                    ys += coefficient
+
+                return ys + 0.0  # For evit -0.0
+
+            for coefficient, degree in self.terms:
+                if degree == 0:
+                    ys += coefficient
+
+                elif degree == 1:
+                    ys += coefficient * xs
+
+                else:
+                    ys += coefficient * xs ** degree
+
+        return ys + 0.0  # For evit -0.0
+
+    def evaluate_interval(self, x):
+        """
+        Bound the values of the function for all the values of the
+        interval x, see intervals.py.
+
+        >>> f = Function('f(x) = x^2 - 1')
+        >>> f.evaluate_interval(intervals.Interval(-1, 2))
+        [-1.0, 3.0]
+        """
+        x = intervals.make_interval(x)
+        y = intervals.Interval(0)
+        for coefficient, degree in self.terms:
+            y += coefficient * x ** degree
+
+        return y
 
     def get_x(self, y):
-        equation = Equation(self.polynomial.repr + '=' + str(y))
-        solution = equation.solve()
+        """
+        The real values of x where f(x) = y.
+
+        >>> Function('f(x) = x^3 - x').get_x(0)
+        (1.0, 0.0, -1.0)
+        """
+        solution = Equation((self.polynomial, y)).solve()
+        if solution is None:
+            return None
 
-        return(solution)
+        return tuple([x for x in solution if type(x) != complex])
 
     def get_coefficient(self, degree=None):
         if degree is None:
             degree = self.polynomial.get_max_degree()
 
-        if degree in self.polynomial.monomials:
-            monomial = self.polynomial.monomials[degree][0]
-            number = float(monomial.sign + str(monomial.coefficient))
-            return number
-
-        else:
-            return 0
+        return float(self.polynomial.get_coefficient(degree))
 
     def get_vertex(self):
         if self.polynomial.get_max_degree() < 2:
             return
 
-        monomials = self.polynomial.monomials
         a = self.get_coefficient()
         b = self.get_coefficient(1)
         c = self.get_coefficient(0)
-        if 1 in monomials:
-            b = float(monomials[1][0].sign + str(monomials[1][0].coefficient))
-        else:
-            b = 0
-
-        if 0 in monomials:
-            c = float(monomials[0][0].sign + str(monomials[0][0].coefficient))
-        else:
-            c = 0
 
         Vx = float(-(b / 2.0 * a))
         if Vx == 0:  # For evit (-0.0; -0.0)
@@ -1033,18 +1207,30 @@ class Function(object):
     def __repr__(self):
         return self.repr
 
+    def copy(self):
+        """
+        A new function that shares the compiled data, but not the color.
+        """
+        function = Function.__new__(Function)
+        function.__dict__.update(self.__dict__)
+        return function
+
+    def __getstate__(self):
+        # The evaluator can't be pickled, it's compiled again after
+        state = dict(self.__dict__)
+        del state['evaluator']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compile()
+
     def __call__(self, value=0):
-        _repr = G.clean_string(self.polynomial.repr)
-        for x in range(0, 10):
-            # Remplaces number [0-9]x to [0-9]*x
-            # 1x -- > 1*x
-            # 2x -- > 2*x ...
-            _repr = _repr.replace('%dx' % x, '(%d*x)' % x)
-            _repr = _repr.replace('%d(' % x, '%d*(' % x)
-            _repr = _repr.replace(')%d' % x, ')*%d' % x)
-
-        _repr = _repr.replace('x', str(value))
-        _float = float(eval(_repr))
+        if self.vector is not None:
+            _float = algebra.horner(self.vector, float(value))
+
+        else:
+            _float = float(self.evaluator(float(value)))
 
         if _float == 0:
             _float = 0.0 # For evit -0.0
@@ -1056,33 +1242,56 @@ class Expression(object):
     """
     A class that handles deduce what a mathematical expression that is passed
     as an argument is.
+
+    The integer results are exact, although they don't fit in a float:
+
+    >>> Expression('171!').repr == str(G.factorial(171))
+    True
+    >>> Expression('2^2000').repr == str(2 ** 2000)
+    True
+    >>> Expression('2^2000 / 2^1999')
+    2
+    >>> Expression('2^2000 x / 2^1999'), Polynomial('2^2000 x') / 2 ** 1999
+    (2x, 2x)
+    >>> Expression('x^2 + 2^70')
+    x^2 + 1180591620717411303424
+    >>> p = Expression('(x + 1)^300').obj
+    >>> p.get_coefficient(150) == G.factorial(300) // G.factorial(150) ** 2
+    True
+    >>> Expression('f(x) = (3x^2 + 4x + 5)^300').obj.degree
+    600
     """
 
     def __init__(self, data):
-        if type(data) in [int, float, Monomial, Polynomial, Equation, Function]:
+        if type(data) in [int, long, float, Monomial, Polynomial, Equation, Function]:
             data = str(data)
 
         if type(data) != str:
             raise TypeError('Type unknown')
 
-        data = G.clean_string(data)
-        if not 'x' in data:
-            #try:
-            data = G.simplify(data, clean=False)
-            #except:
-            #    raise SyntaxError('Bad string, "%s"' % data)
+        tokens = lexer.tokenize(data)
+        sides = lexer.split(tokens, '=')
 
-        if '=' in data:
-            if data.startswith('f(x)') or data.replace(' ', '').startswith('y='):
-                self.obj = Function(data)
+        if not [token for token in tokens if token.kind == lexer.VARIABLE]:
+            self.obj = Polynomial({0: arithmetic.calculate(tokens)})
+            self.repr = self.obj.repr
+
+        elif len(sides) > 1:
+            first = lexer.to_string(sides[0])
+            if first in ['f(x)', 'y']:
+                self.obj = Function(tokens)
                 self.repr = self.obj.repr
 
             else:
-                self.obj = Equation(data)
-                self.repr = self.obj.repr + '   S={%s}' % str(self.obj.solve())
+                self.obj = Equation(tokens)
+                solution = self.obj.solve()
+                if solution is not None:
+                    solution = format_roots(solution)
+
+                self.repr = self.obj.repr + '   S={%s}' % str(solution)
 
         else:
-            self.obj = Polynomial(data)
+            self.obj = Polynomial(tokens)
             self.repr = self.obj.repr
 
     def is_polynomial(self):
@@ -1099,3 +1308,83 @@ class Expression(object):
 
     def __repr__(self):
         return self.repr
+
+
+class ExpressionCache(object):
+    """
+    A bounded LRU cache of the parsed expressions, by the normalized input
+    (the output of clean_string).
+
+    >>> cache = ExpressionCache(2)
+    >>> cache.set('1+1', Expression('1+1'))
+    >>> cache.get('1+1'), cache.get('2+2')
+    (2, None)
+    >>> sorted(cache.get_stats().items())
+    [('evictions', 0), ('hits', 1), ('misses', 1), ('size', 1)]
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        expression = self.entries.pop(key, None)
+        if expression is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries[key] = expression  # Now is the most recently used
+        return expression
+
+    def set(self, key, expression):
+        self.entries.pop(key, None)
+        self.entries[key] = expression
+
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.entries)}
+
+
+CACHE = ExpressionCache()
+
+
+def make_expression(data):
+    """
+    Get the Expression of a string, using the cache of parsed expressions.
+    """
+    key = G.clean_string(data)
+    expression = CACHE.get(key)
+
+    if expression is None:
+        expression = Expression(key)
+        CACHE.set(key, expression)
+
+    return share_expression(expression)
+
+
+def share_expression(expression):
+    """
+    The expressions of the cache are shared, but the functions are copied
+    so each plotted function has its own color.
+    """
+    if expression.is_function():
+        expression = copy.copy(expression)
+        expression.obj = expression.obj.copy()
+
+    return expression
@@ -18,21 +18,13 @@
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
 import math
-from gi.repository import Gdk
 
 PI = 3.141592653589793238462643383279502884196406286208998628034825342117067982
 
-EXPRESSIONS = [['**', '^'],
-               ['/', '÷'],
-               ['*', '×'],
-               ['True', 'Correct'],
-               ['False', 'Incorrect'],
-               ['PI', str(PI)],
-               ['π', str(PI)]]
-
 SYMBOL_DEL = 'DEL'
 SYMBOL_INFINITY = '∞'
 SYMBOL_OK = '✓'
+SYMBOL_CANCEL = '✗'
 SYMBOL_SQUARE_ROOT = '√'
 OPERATOR_DIV = '÷'
 OPERATOR_MUL = '×'
@@ -43,20 +35,37 @@ OPERATORS = [OPERATOR_DIV,
              OPERATOR_ADD,
              OPERATOR_SUB]
 
+TEXT_COMPUTING = 'computing…'
+
 SPECIAL_FUNCTIONS = ['sin', 'cos', 'tan', 'In', 'log', 'factorial']
 SPECIAL_OPERATORS = {'!': 'factorial', SYMBOL_SQUARE_ROOT: 'square_root'}
 
+numpy = False  # Not imported yet, see get_numpy
+
 
 def clean_string(text):
-    text = text.lower()
-    for expression in EXPRESSIONS:
-        text = text.replace(expression[1], expression[0])
+    """
+    Normalize an expression so it can be evaluated, reading it only once.
+    Example:
+        '2(3 + π)÷4' --> '2*(3+3.141592653589793)/4'
+    """
+    import lexer  # lexer imports globals
+
+    return lexer.to_string(lexer.tokenize(text))
 
-    for x in range(0, 10):
-        text = text.replace('%d(' % x, '%d*(' % x)
-        text = text.replace(')%d' % x, ')*%d' % x)
 
-    return text
+def format_number(number):
+    """
+    Format a number for the representation of monomials and polynomials,
+    without a decimal part if it's an integer: 3.0 --> '3', 2.5 --> '2.5'
+    """
+    if not isinstance(number, float):
+        return '%d' % number  # Integers are exact, like 30!
+
+    if abs(number) < 1e15 and number == int(number):
+        return '%d' % number
+
+    return '%.12g' % number
 
 
 def square_root(number):
@@ -118,73 +127,40 @@ def log(x):
     return math.log(x)
 
 
-def simplify(data, clean=True):
-    if clean:
-        data = clean_string(data)
-
-    data = data.replace('+', 'SPLIT+')
-    data = data.replace('-', 'SPLIT-')
-    data = data.replace('(SPLIT', '(')
-    _monomials = data.split('SPLIT')
-    monomials = []
-    final = ''
-
-    for monomial in _monomials:
-        if not monomial:
-            continue
-
-        has_operator = False
-
-        for operator in list(SPECIAL_OPERATORS.keys()):
-            if operator in monomial:
-                has_operator = True
-
-                if monomial.startswith(operator):
-                    _number = monomial.split(operator)[1]
-
-                    n = 0
-                    number = ''
-                    while True:
-                        if not _number[n].isalnum() and _number.strip() not in ['', '(']:
-                            continue
-
-                        number = _number[n] + number
-                        n += 1
-
-                        if n == len(_number):
-                            break
-
-                    monomials.append(monomial.replace(operator + number, str(eval('%s(%s)' % (SPECIAL_OPERATORS[operator], number)))))
-
-                elif monomial.endswith(operator):
-                    _number = monomial.split(operator)[0]
-
-                    n = -1
-                    number = ''
-                    while True:
-                        if not _number[n].isalnum() and _number.strip() not in ['', '(']:
-                            continue
-
-                        number = _number[n] + number
-                        n -= 1
+def get_numpy():
+    """
+    Import numpy the first time that it's needed, it's slow to import and
+    only some operations use it. None if it isn't installed.
+    """
+    global numpy
+    if numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
 
-                        if -n == len(_number) + 1:
-                            break
+    return numpy
 
-                    monomials.append(monomial.replace(number + operator, str(eval('%s(%s)' % (SPECIAL_OPERATORS[operator], number)))))
 
-        if not has_operator:
-            monomials.append(str(eval(monomial)))
+def make_namespace():
+    """
+    Namespace used to evaluate compiled expressions, without builtins.
+    """
+    namespace = {'__builtins__': {}}
+    for name in SPECIAL_FUNCTIONS + list(SPECIAL_OPERATORS.values()):
+        namespace[name] = globals()[name]
 
-    for x in monomials:
-        if x[0] not in ['+', '-']:
-            x = '+' + x
+    namespace['PI'] = PI
+    return namespace
 
-        x = str(eval(x))
-        final += ('+' if not x[0] in ['+', '-'] else '') + x
 
-    return str(eval(final))
+def simplify(data):
+    """
+    Evaluate a numeric expression, like '2 + √9 - 3!' --> '-1'
+    """
+    import arithmetic  # arithmetic imports globals
 
+    return format_number(arithmetic.calculate(data))
 
 
 def color_hex_to_cairo(color):
@@ -220,6 +196,8 @@ def color_cairo_to_rgb(color):
 
 
 def color_cairo_to_gdk(color):
+    from gi.repository import Gdk  # Not needed without the interface
+
     return Gdk.Color(color[0] * 65535, color[1] * 65535, color[2] * 65535)
 
 
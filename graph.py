@@ -0,0 +1,738 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import math
+import cairo
+
+from gi.repository import Gtk
+from gi.repository import Gdk
+from gi.repository import GObject
+
+from expressions import Function
+
+from intervals import Interval
+
+from spatial import PointStore
+
+import globals as G
+
+
+class GraphArea(Gtk.DrawingArea):
+
+    def __init__(self, functions=[]):
+        Gtk.DrawingArea.__init__(self)
+
+        self.functions = []
+        for function in functions:
+            if type(function) == str:
+                function = Function(function)
+
+            if type(function) == Function:
+                self.functions.append(function)
+
+        self.context = None
+        self.background_color = (1, 1, 1)
+        self.axis_color = (0, 0, 0)
+        self.grid_color = (0.8, 0.8, 0.8)
+        self.line_color = (0, 0, 1)
+        self.line_width = 2
+        self.axis_width = 4
+        self.grid_width = 1
+        self.unit_space = 50
+        self.font_size = self.unit_space / 2.0
+        self.font_color = (0.4, 0.4, 0.4)
+        self.points = PointStore()
+        self.point_color = (1, 0, 0)
+        self.point_width = 5
+        self.init_x = 0
+        self.init_y = 0
+        self.drag_point = None
+        self.min_x = 0
+        self.max_x = 0
+        self.min_y = 0
+        self.max_y = 0
+        self.background = None  # Grid, axes and labels, see get_background
+        self.background_key = None
+        self.paths = {}  # Function: (viewport, path, uncertain), see get_path
+        self.sample_step = 8  # Pixels between the first samples of a curve
+        self.sample_tolerance = 0.5  # Pixels
+        self.interval_mode = False  # See sample_intervals
+        self.interval_depth = 4  # Subdivisions of a pixel column
+        self.menu = None
+        self.f_cursor_pos = (0.0, 0.0)
+        self.i_cursor_pos = (0, 0)
+
+        self.add_events(Gdk.EventMask.SCROLL_MASK |
+                        Gdk.EventMask.BUTTON_PRESS_MASK |
+                        Gdk.EventMask.BUTTON_RELEASE_MASK |
+                        Gdk.EventMask.POINTER_MOTION_MASK)
+
+        self.connect('scroll-event', self.__scroll_event_cb)
+        self.connect('button-press-event', self.__button_press_event_cb)
+        self.connect('button-release-event', self.__button_release_event_cb)
+        self.connect('motion-notify-event', self.__button_motion_event_cb)
+        self.connect('draw', self.__draw_cb)
+
+    def __scroll_event_cb(self, widget, event):
+        scroll = event.get_scroll_direction()[1]
+        if scroll == Gdk.ScrollDirection.UP:
+            if self.unit_space < 200:
+                self.unit_space += 10
+
+        elif scroll == Gdk.ScrollDirection.DOWN:
+            if self.unit_space > 20:
+                self.unit_space -= 10
+
+        self.font_size = self.unit_space / 2.0
+        GObject.idle_add(self.queue_draw)
+
+    def __button_press_event_cb(self, widget, event):
+        if event.button == 1:
+            self.drag_point = (event.x - self.init_x, event.y - self.init_y)
+
+        elif event.button == 3:
+            self.make_menu(event.x, event.y)
+            self.menu.popup(None, None, None, None, event.button, event.time)
+            return True
+
+    def __button_release_event_cb(self, widget, event):
+        self.drag_point = None
+
+    def __button_motion_event_cb(self, widget, event):
+        fx, fy = self.get_symbolic_point(event.x, event.y)
+        self.f_cursor_pos = (fx, fy)
+        self.i_cursor_pos = (int(round(fx)), int(round(fy)))
+
+        if self.drag_point:
+            self.init_x = event.x - self.drag_point[0]
+            self.init_y = event.y - self.drag_point[1]
+
+            GObject.idle_add(self.queue_draw)
+
+    def __draw_cb(self, widget, context):
+        allocation = self.get_allocation()
+        self.context = context
+        self.width = allocation.width
+        self.height = allocation.height
+
+        self.render()
+
+    def make_menu(self, x, y):
+        fx, fy = self.f_cursor_pos
+        ix, iy = self.i_cursor_pos
+        self.menu = Gtk.Menu()
+
+        item = Gtk.MenuItem('Go to (0.0)')
+        item.connect('activate', lambda item: self.go_to(0, 0, True))
+        self.menu.append(item)
+
+        if not (ix, iy) in self.points:
+            item = Gtk.MenuItem('Make a point to (%d; %d)' % (ix, iy))
+            item.connect('activate', lambda item: self.add_point(ix, iy))
+
+        else:
+            item = Gtk.MenuItem('Remove point (%d; %d)' % (ix, iy))
+            item.connect('activate', lambda item: self.remove_point(ix, iy))
+
+        self.menu.append(item)
+
+        # A point under the cursor, at less than the size of a point
+        point = self.points.get_nearest(fx, fy, float(self.point_width) / self.unit_space)
+        if point is not None and point != (ix, iy):
+            px, py = point
+            item = Gtk.MenuItem('Remove point (%f; %f)' % (px, py))
+            item.connect('activate', lambda item: self.remove_point(px, py))
+
+        else:
+            item = Gtk.MenuItem('Make a point to (%f; %f)' % (fx, fy))
+            item.connect('activate', lambda item: self.add_point(fx, fy))
+
+        self.menu.append(item)
+
+        item = Gtk.CheckMenuItem('Plot with intervals')
+        item.set_active(self.interval_mode)
+        item.connect('toggled', lambda item: self.set_interval_mode(item.get_active()))
+        self.menu.append(item)
+
+        self.menu.show_all()
+
+    def go_to(self, x, y, from_menu=True):
+        if from_menu:
+            self.unit_space = 50
+            self.font_size = 25.0
+
+        self.init_x = x
+        self.init_y = y
+        GObject.idle_add(self.queue_draw)
+
+    def set_interval_mode(self, interval_mode, update=True):
+        self.interval_mode = interval_mode
+        if update:
+            GObject.idle_add(self.queue_draw)
+
+    def add_function(self, function, update=True):
+        if type(function) == str:
+            function = Function(function)
+            color = self.line_color
+
+        if type(function) == Function:
+            self.functions.append(function)
+            if update:
+                GObject.idle_add(self.queue_draw)
+
+    def remove_function(self, function, update=True):
+        if function in self.functions:
+            self.functions.remove(function)
+            self.paths.pop(function, None)
+            if update:
+                GObject.idle_add(self.queue_draw)
+
+    def add_point(self, x, y, update=True):
+        if self.points.add(x, y):
+            if update:
+                GObject.idle_add(self.queue_draw)
+
+    def remove_point(self, x, y, update=True):
+        if self.points.remove(x, y):
+            if update:
+                GObject.idle_add(self.queue_draw)
+
+    def render(self):
+        self.context.set_source_surface(self.get_background(), 0, 0)
+        self.context.paint()
+
+        for function in self.functions:
+            self.render_graph(function)
+
+        # Only the visible points
+        for point in self.points.get_range(self.min_x, self.max_x, self.min_y, self.max_y):
+            self.draw_point(*point)
+
+    def get_background(self):
+        """
+        The static layer(background, grid, axes and labels) is drawn on an
+        off-screen surface, that is only made again when the zoom, the size
+        or the position of the axes change.
+        """
+        key = (self.width, self.height, self.init_x, self.init_y, self.unit_space)
+        if self.background is None or self.background_key != key:
+            self.background = self.context.get_target().create_similar(
+                cairo.CONTENT_COLOR, self.width, self.height)
+            self.background_key = key
+
+            context = self.context
+            self.context = cairo.Context(self.background)
+            self.render_background()
+            self.render_grid()
+            self.render_axis()
+            self.context = context
+
+            self.update_bounds()
+
+        return self.background
+
+    def update_bounds(self):
+        """
+        The units visible on each side of the axes, with a margin of two.
+        """
+        x = self.init_x + self.width / 2.0
+        y = self.height / 2.0 + self.init_y
+
+        self.min_x = -int(math.ceil(x / self.unit_space)) - 2
+        self.max_x = int(math.ceil((self.width - x) / self.unit_space)) + 2
+        self.min_y = -int(math.ceil((self.height - y) / self.unit_space)) - 2
+        self.max_y = int(math.ceil(y / self.unit_space)) + 2
+
+    def render_background(self):
+        self.context.set_source_rgb(*self.background_color)
+        self.context.rectangle(0, 0, self.width, self.height)
+        self.context.fill()
+
+    def render_grid(self):
+        x = self.init_x + self.width / 2.0
+        y = self.height / 2.0 + self.init_y
+
+        self.context.set_line_width(self.grid_width)
+        self.context.set_font_size(self.font_size)
+
+        _x = x + self.axis_width / 2.0
+        n = 0
+        while _x < self.width + 2:
+            _x += self.unit_space
+            self.context.set_source_rgb(*self.grid_color)
+            self.context.move_to(_x, 0)
+            self.context.line_to(_x, self.height)
+
+            self.context.set_source_rgb(*self.font_color)
+            self.context.move_to(_x - self.unit_space, self.height / 2.0 + self.init_y + self.unit_space / 2.0)
+            self.context.show_text(str(n))
+
+            n += 1
+
+        _x = x - self.axis_width / 2.0
+        n = 0
+        while _x > 0:
+            self.context.set_source_rgb(*self.grid_color)
+            _x -= self.unit_space
+            self.context.move_to(_x, 0)
+            self.context.line_to(_x, self.height)
+
+            if n != 0:
+                self.context.set_source_rgb(*self.font_color)
+                self.context.move_to(_x + self.unit_space, self.height / 2.0 + self.init_y + self.unit_space / 2.0)
+                self.context.show_text('-' + str(n))
+
+            n += 1
+
+        _y = y + self.axis_width / 2.0
+        n = 0
+        while _y < self.height:
+            _y += self.unit_space
+            self.context.move_to(0, _y)
+            self.context.line_to(self.width, _y)
+
+            if n != 0:
+                self.context.set_source_rgb(*self.font_color)
+                self.context.move_to(self.width / 2.0 + self.init_x + self.font_size / 3.0, _y - self.unit_space / 2.0)
+                self.context.show_text('-' + str(n))
+
+            n += 1
+
+        _y = y - self.axis_width / 2.0
+        n = 0
+        while _y > 0:
+            _y -= self.unit_space
+            self.context.move_to(0, _y)
+            self.context.line_to(self.width, _y)
+
+            if n != 0:
+                self.context.set_source_rgb(*self.font_color)
+                self.context.move_to(self.width / 2.0 + self.init_x + self.font_size / 3.0, _y + self.unit_space * 3 / 2.0)
+                self.context.show_text(str(n))
+
+            n += 1
+
+        self.context.stroke()
+
+    def render_axis(self):
+        self.context.set_source_rgb(*self.axis_color)
+        self.context.set_line_width(self.axis_width)
+        self.context.move_to(0, self.height / 2.0 + self.init_y)
+        self.context.line_to(self.width, self.height / 2.0 + self.init_y)
+        self.context.move_to(self.width / 2.0 + self.init_x, 0)
+        self.context.line_to(self.width / 2.0 + self.init_x, self.height)
+        self.context.stroke()
+
+    def render_graph(self, function):
+        path, uncertain = self.get_path(function)
+        self.context.set_source_rgb(*function.color)
+        self.context.set_line_width(self.line_width)
+        self.context.append_path(path)
+        if self.interval_mode:
+            self.context.fill()
+        else:
+            self.context.stroke()
+
+        if uncertain is not None:
+            # The columns that couldn't be decided are lighter
+            self.context.set_source_rgba(*tuple(function.color) + (0.3,))
+            self.context.append_path(uncertain)
+            self.context.fill()
+
+        if function.degree in [0, 1]:
+            y = self.evaluate(function, 0)
+            if y is not None:
+                self.add_point(0, float(y))
+
+    def get_path(self, function):
+        """
+        The path of a function is kept while the viewport doesn't change, so
+        a change of color or a redraw don't evaluate the function again.
+        Returns the path and the path of the uncertain rectangles, None out
+        of the interval mode.
+        """
+        viewport = (self.init_x, self.init_y, self.unit_space, self.width, self.height,
+                    self.interval_mode)
+        if function in self.paths and self.paths[function][0] == viewport:
+            return self.paths[function][1:]
+
+        uncertain = None
+        self.context.new_path()
+        if self.interval_mode:
+            rectangles, uncertain_rectangles = self.sample_intervals(function)
+            if uncertain_rectangles:
+                for rectangle in uncertain_rectangles:
+                    self.context.rectangle(*rectangle)
+
+                uncertain = self.context.copy_path()
+                self.context.new_path()
+
+            for rectangle in rectangles:
+                self.context.rectangle(*rectangle)
+
+        else:
+            for segment in self.sample_function(function):
+                self.context.move_to(*segment[0])
+                for point in segment[1:]:
+                    self.context.line_to(*point)
+
+        path = self.context.copy_path()
+        self.context.new_path()
+        self.paths[function] = (viewport, path, uncertain)
+        return path, uncertain
+
+    def sample_function(self, function):
+        """
+        Get the visible segments of the curve, as lists of points in
+        pixels.
+
+        The function is evaluated every sample_step pixels, and each
+        interval is subdivided while the curve bends or leaves the screen,
+        until the interval is a pixel wide. So it works for any degree,
+        with the fewest evaluations for the current unit_space.
+        """
+        x1 = self.get_symbolic_point(0, 0)[0]
+        x2 = self.get_symbolic_point(self.width, 0)[0]
+        columns = max(int(self.width / self.sample_step), 2)
+        min_width = (x2 - x1) / float(self.width or 1)  # A pixel column
+
+        xs = [x1 + (x2 - x1) * i / float(columns) for i in range(columns + 1)]
+        try:
+            ys = function.evaluate_many(xs)
+        except (ArithmeticError, ValueError):
+            ys = [self.evaluate(function, x) for x in xs]
+
+        points = [self.get_sample_point(x, y) for x, y in zip(xs, ys)]
+
+        segments = []
+        segment = []
+        for index in range(columns):
+            pending = [(xs[index], points[index], xs[index + 1], points[index + 1])]
+
+            while pending:
+                a, point_a, b, point_b = pending.pop()
+                if b - a > min_width:
+                    m = (a + b) / 2.0
+                    point_m = self.get_sample_point(m, self.evaluate(function, m))
+
+                    if self.must_subdivide(point_a, point_m, point_b):
+                        # The second half is drawed after the first one
+                        pending.append((m, point_m, b, point_b))
+                        pending.append((a, point_a, m, point_m))
+                        continue
+
+                side_a = None if point_a is None else self.get_screen_side(point_a)
+                side_b = None if point_b is None else self.get_screen_side(point_b)
+                if None in [side_a, side_b] or side_a == side_b != 0 or \
+                        (side_a * side_b == -1 and not self.is_continuous(function, a, b)):
+                    # A discontinuity(a jump over the whole screen in a
+                    # pixel, that isn't a steep line), or a part out of the
+                    # screen
+                    if len(segment) > 1:
+                        segments.append(segment)
+
+                    segment = []
+                    continue
+
+                if not segment:
+                    segment.append(self.clamp_point(point_a))
+
+                segment.append(self.clamp_point(point_b))
+
+        if len(segment) > 1:
+            segments.append(segment)
+
+        return segments
+
+    def sample_intervals(self, function):
+        """
+        Get the rectangles, in pixels, that contain the curve in each pixel
+        column.
+
+        The function is bounded with interval arithmetic in the whole
+        column, so nothing of the curve is missed between two samples and
+        the asymptotes aren't joined. Only the columns where the function
+        isn't continuous are subdivided, until interval_depth times, so a
+        column costs at most 2^(interval_depth + 1) - 1 evaluations.
+
+        Returns the rectangles and the uncertain rectangles, the parts that
+        still aren't continuous at the last depth, clipped to the screen.
+        """
+        x1 = self.get_symbolic_point(0, 0)[0]
+        x2 = self.get_symbolic_point(self.width, 0)[0]
+        columns = max(int(self.width), 1)
+
+        rectangles = []
+        uncertain = []
+        for column in range(columns):
+            pending = [(x1 + (x2 - x1) * column / float(columns),
+                        x1 + (x2 - x1) * (column + 1) / float(columns), 0)]
+
+            while pending:
+                a, b, depth = pending.pop()
+                y = self.evaluate_interval(function, a, b)
+                if y is None:
+                    continue
+
+                rectangle = self.get_interval_rectangle(a, b, y)
+                if rectangle is None:
+                    continue  # Out of the screen
+
+                if y.continuous:
+                    rectangles.append(rectangle)
+
+                elif depth < self.interval_depth:
+                    m = (a + b) / 2.0
+                    pending.append((m, b, depth + 1))
+                    pending.append((a, m, depth + 1))
+
+                else:
+                    uncertain.append(rectangle)
+
+        return rectangles, uncertain
+
+    def is_continuous(self, function, a, b):
+        y = self.evaluate_interval(function, a, b)
+        return y is not None and y.continuous
+
+    def evaluate_interval(self, function, a, b):
+        try:
+            return function.evaluate_interval(Interval(a, b))
+        except (ArithmeticError, ValueError):
+            return None
+
+    def get_interval_rectangle(self, a, b, y):
+        """
+        The rectangle(x, y, width, height) of the bounds y in [a, b], at
+        least as high as a line, or None if it's out of the screen.
+        """
+        left = self.get_real_point(a, 0)[0]
+        right = self.get_real_point(b, 0)[0]
+        top = self.get_real_point(0, y.high)[1]
+        bottom = self.get_real_point(0, y.low)[1]
+        if top > self.height or bottom < 0:
+            return None
+
+        top = max(top, -self.line_width)
+        bottom = min(bottom, self.height + self.line_width)
+        if bottom - top < self.line_width:
+            middle = (top + bottom) / 2.0
+            top = middle - self.line_width / 2.0
+            bottom = middle + self.line_width / 2.0
+
+        return (left, top, right - left, bottom - top)
+
+    def evaluate(self, function, x):
+        try:
+            return function(x)
+        except (ArithmeticError, ValueError):
+            return None
+
+    def get_sample_point(self, x, y):
+        if y is None or y != y or abs(y) == float('inf'):  # y != y for NaN
+            return None
+
+        return self.get_real_point(x, y)
+
+    def get_screen_side(self, point):
+        """
+        -1 over the screen, 1 under the screen and 0 inside the screen.
+        """
+        if point[1] < 0:
+            return -1
+
+        elif point[1] > self.height:
+            return 1
+
+        return 0
+
+    def must_subdivide(self, point_a, point_m, point_b):
+        if point_a is None or point_b is None or point_m is None:
+            # Find the border of the discontinuity
+            return (point_a, point_m, point_b) != (None, None, None)
+
+        side_a = self.get_screen_side(point_a)
+        side_m = self.get_screen_side(point_m)
+        side_b = self.get_screen_side(point_b)
+        if side_a == side_m == side_b != 0:
+            return False
+
+        if side_a != side_b or side_m != side_a:
+            # The curve enters or leaves the screen
+            return True
+
+        # The curve bends: the middle point is far of the chord
+        chord = (point_a[1] + point_b[1]) / 2.0
+        return abs(point_m[1] - chord) > self.sample_tolerance
+
+    def clamp_point(self, point):
+        """
+        Keep the points out of the screen near of it, cairo doesn't like
+        huge coordinates.
+        """
+        return (point[0], min(max(point[1], -self.height), self.height * 2))
+
+    def draw_point(self, x, y, color=None, size=None):
+        x, y = self.get_real_point(x, y)
+        if color is None:
+            color = self.point_color
+
+        if len(color) == 3:
+            color += (1.0,)
+
+        if not size:
+            size = self.point_width
+
+        self.context.set_source_rgba(*color)
+        self.context.arc(x, y, size, 0, 2 * G.PI)
+        self.context.fill()
+
+    def draw_curve(self, x1, y1, x2, y2, x3, y3, color=None, line_width=None):
+        x1, y1 = self.get_real_point(x1, y1)
+        x2, y2 = self.get_real_point(x2, y2)
+        x3, y3 = self.get_real_point(x3, y3)
+
+        if not color:
+            color = self.line_color
+
+        if not line_width:
+            line_width = self.line_width
+
+        self.context.set_source_rgb(*color)
+        self.context.set_line_width(self.line_width)
+
+        self.context.move_to(x1, y1)
+        self.context.curve_to(x1, y1, x2, y2, x3, y3)
+        self.context.stroke()
+
+    def get_real_point(self, x, y):
+        _x = x * self.unit_space
+        _x += self.width / 2.0
+        _x += self.init_x
+        if x != 0:
+            _x += self.axis_width / 2.0 if x > 0 else self.axis_width / - 2.0
+
+        _y = y * -self.unit_space
+        _y += self.height / 2.0
+        _y += self.init_y
+        if y != 0:
+            _y -= self.axis_width / 2.0 if y > 0 else self.axis_width / - 2.0
+
+        return (_x, _y)
+
+    def get_symbolic_point(self, x, y):
+        _x = x
+        _y = y
+
+        _x -= self.width / 2.0
+        _x -= self.init_x
+        if x != 0:
+            _x -= self.axis_width / 2.0 if x > 0 else self.axis_width / - 2.0
+        _x /= self.unit_space
+
+        _y -= self.height / 2.0
+        _y -= self.init_y
+        if y != 0:
+            _y -= self.axis_width / 2.0 if y > 0 else self.axis_width / - 2.0
+
+        _y /= -self.unit_space
+
+        return (_x, _y)
+
+
+class GraphList(Gtk.ScrolledWindow):
+
+    __gsignals__ = {
+        'remove-function': (GObject.SIGNAL_RUN_FIRST, None, [object]),
+        'update-request': (GObject.SIGNAL_RUN_FIRST, None, []),
+    }
+
+    def __init__(self):
+        Gtk.ScrolledWindow.__init__(self)
+
+        self.rows = {}
+
+        self.listbox = Gtk.ListBox()
+        self.add(self.listbox)
+        self.set_size_request(200, -1)
+
+    def add_function(self, function):
+        color = G.color_cairo_to_gdk(function.color)
+
+        row = Gtk.ListBoxRow()
+        self.rows[function] = row
+        self.listbox.add(row)
+
+        hbox = Gtk.HBox()
+        row.add(hbox)
+
+        label = Gtk.Label(function.polynomial.repr)
+        label.modify_fg(Gtk.StateType.NORMAL, color)
+        hbox.pack_start(label, False, False, 0)
+
+        image = Gtk.Image.new_from_stock(Gtk.STOCK_REMOVE, Gtk.IconSize.BUTTON)
+        button = Gtk.Button(image=image)
+        button.connect('clicked', self._remove_function, function)
+        hbox.pack_end(button, False, False, 10)
+
+        button = Gtk.ColorButton()
+        button.set_color(color)
+        button.connect('color-set', self.choice_color, function)
+        hbox.pack_end(button, False, False, 0)
+
+        self.show_all()
+
+    def remove_function(self, function):
+        self.listbox.remove(self.rows[function])
+
+    def _remove_function(self, button, function):
+        self.emit('remove-function', function)
+
+    def choice_color(self, color, function):
+        if type(color) == Gtk.ColorButton:
+            color = G.color_gdk_to_cairo(color.get_color())
+
+        function.color = color
+        self.emit('update-request')
+
+
+class GraphManager(Gtk.HBox):
+
+    def __init__(self):
+        Gtk.HBox.__init__(self)
+
+        self.area = GraphArea()
+        self.list = GraphList()
+
+        self.list.connect('remove-function', lambda w, f: self.remove_function(f))
+        self.list.connect('update-request', self.update_request)
+
+        self.pack_start(self.area, True, True, 0)
+        self.pack_end(self.list, False, False, 0)
+
+    def add_function(self, function):
+        self.area.add_function(function)
+        self.list.add_function(function)
+
+    def remove_function(self, function):
+        self.area.remove_function(function)
+        self.list.remove_function(function)
+
+    def update_request(self, *args):
+        self.area.queue_draw()
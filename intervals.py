@@ -0,0 +1,292 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+"""
+Interval arithmetic: each operation gives the bounds of all its possible
+results, so the value of a function in a whole range of x is bounded with
+a single evaluation:
+
+>>> Interval(1, 2) + Interval(3, 4)
+[4.0, 6.0]
+>>> Interval(-1, 2) ** 2
+[0.0, 4.0]
+>>> x = Interval(1, 2)
+>>> evaluate(arithmetic.parse('x^2 - 2x'), x)
+[-3.0, 2.0]
+
+The bounds can be wider than the real range, because each appearance of
+x is taken as independent (x^2 - 2x is in [-1, 0] for x in [1, 2]), but
+they always contain it, and they get closer when the interval is smaller.
+
+An interval isn't continuous if the function has a discontinuity, or
+isn't defined, for some x of the range, like 1/x around 0:
+
+>>> y = evaluate(arithmetic.parse('1/x'), Interval(-1, 1))
+>>> y, y.continuous
+([-inf, inf], False)
+
+The bounds aren't rounded outward, the rounding errors are very smaller
+than a pixel of the graph.
+"""
+
+import math
+import operator
+
+import arithmetic
+import globals as G
+
+INFINITY = float('inf')
+
+
+class Interval(object):
+
+    __slots__ = ['low', 'high', 'continuous']
+
+    def __init__(self, low, high=None, continuous=True):
+        if high is None:
+            high = low
+
+        if low != low or high != high:
+            # NaN, like inf - inf
+            low, high, continuous = -INFINITY, INFINITY, False
+
+        self.low = float(low)
+        self.high = float(high)
+        self.continuous = continuous
+
+    def __repr__(self):
+        return '[%r, %r]' % (self.low, self.high)
+
+    def __contains__(self, number):
+        return self.low <= number <= self.high
+
+    def is_number(self):
+        return self.low == self.high
+
+    def __add__(self, other):
+        other = make_interval(other)
+        return Interval(self.low + other.low, self.high + other.high,
+                        self.continuous and other.continuous)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        return self + (-make_interval(other))
+
+    def __rsub__(self, other):
+        return make_interval(other) + (-self)
+
+    def __neg__(self):
+        return Interval(-self.high, -self.low, self.continuous)
+
+    def __mul__(self, other):
+        other = make_interval(other)
+        products = [multiply(a, b) for a in [self.low, self.high] for b in [other.low, other.high]]
+        return Interval(min(products), max(products), self.continuous and other.continuous)
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __div__(self, other):
+        other = make_interval(other)
+        if 0 in other:
+            if other.is_number():
+                raise ZeroDivisionError('float division by zero')
+
+            return Interval(-INFINITY, INFINITY, False)
+
+        return self * Interval(1 / other.high, 1 / other.low, other.continuous)
+
+    def __rdiv__(self, other):
+        return make_interval(other) / self
+
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __pow__(self, other):
+        return power(self, other)
+
+    def __rpow__(self, other):
+        return power(other, self)
+
+    def __abs__(self):
+        if self.low >= 0:
+            return self
+
+        elif self.high <= 0:
+            return -self
+
+        return Interval(0, max(-self.low, self.high), self.continuous)
+
+
+def make_interval(value):
+    if type(value) == Interval:
+        return value
+
+    return Interval(value)
+
+
+def multiply(number1, number2):
+    # 0 * inf is 0 for the bounds, not NaN
+    if not number1 or not number2:
+        return 0.0
+
+    return number1 * number2
+
+
+def power(base, exponent):
+    base = make_interval(base)
+    exponent = make_interval(exponent)
+
+    if not exponent.is_number():
+        # x^y = e^(y log x)
+        return exp(exponent * log(base))
+
+    continuous = base.continuous and exponent.continuous
+    exponent = exponent.low
+
+    if exponent == int(exponent):
+        exponent = int(exponent)
+        if exponent < 0:
+            return 1 / power(base, -exponent)
+
+        elif exponent == 0:
+            return Interval(1, 1, continuous)
+
+        low = base.low ** exponent
+        high = base.high ** exponent
+        if exponent % 2 or base.low >= 0:
+            return Interval(low, high, continuous)
+
+        elif base.high <= 0:
+            return Interval(high, low, continuous)
+
+        return Interval(0, max(low, high), continuous)
+
+    # Only defined for the positive numbers, like (-1.0) ** 0.5
+    if base.high < 0:
+        raise ValueError('negative number cannot be raised to a fractional power')
+
+    if base.low < 0:
+        base = Interval(0, base.high)
+        continuous = False
+
+    if exponent > 0:
+        return Interval(base.low ** exponent, base.high ** exponent, continuous)
+
+    low = base.high ** exponent if base.high else INFINITY
+    high = base.low ** exponent if base.low else INFINITY
+    return Interval(low, high, continuous and base.low > 0)
+
+
+def contains_period(interval, start, period):
+    """
+    If some start + k * period is inside of the interval, for an integer k.
+    """
+    return math.ceil((interval.low - start) / period) <= math.floor((interval.high - start) / period)
+
+
+def sin(interval):
+    return cos(make_interval(interval) - G.PI / 2)
+
+
+def cos(interval):
+    interval = make_interval(interval)
+    if interval.high - interval.low >= 2 * G.PI:
+        return Interval(-1, 1, interval.continuous)
+
+    values = [math.cos(interval.low), math.cos(interval.high)]
+    low = -1 if contains_period(interval, G.PI, 2 * G.PI) else min(values)
+    high = 1 if contains_period(interval, 0, 2 * G.PI) else max(values)
+    return Interval(low, high, interval.continuous)
+
+
+def tan(interval):
+    interval = make_interval(interval)
+    if interval.high - interval.low >= G.PI or contains_period(interval, G.PI / 2, G.PI):
+        return Interval(-INFINITY, INFINITY, False)  # An asymptote
+
+    return Interval(math.tan(interval.low), math.tan(interval.high), interval.continuous)
+
+
+def log(interval):
+    interval = make_interval(interval)
+    if interval.high <= 0:
+        raise ValueError('math domain error')
+
+    if interval.low <= 0:
+        return Interval(-INFINITY, math.log(interval.high), False)
+
+    return Interval(math.log(interval.low), math.log(interval.high), interval.continuous)
+
+
+def exp(interval):
+    interval = make_interval(interval)
+    return Interval(math.exp(interval.low), math.exp(interval.high), interval.continuous)
+
+
+def square_root(interval):
+    # Like G.square_root, the square root of the absolute value
+    interval = abs(make_interval(interval))
+    return Interval(math.sqrt(interval.low), math.sqrt(interval.high), interval.continuous)
+
+
+def In(interval):
+    return make_interval(interval)
+
+
+def only_numbers(function):
+    """
+    The operations without interval version, like the factorial, only
+    are calculated for numbers, else any result is possible.
+    """
+    def operation(*intervals):
+        intervals = [make_interval(interval) for interval in intervals]
+        if [interval for interval in intervals if not interval.is_number()]:
+            return Interval(-INFINITY, INFINITY, False)
+
+        return Interval(function(*[interval.low for interval in intervals]))
+
+    return operation
+
+
+OPERATIONS = {'+': operator.add,
+              '-': operator.sub,
+              '*': operator.mul,
+              '/': lambda number1, number2: make_interval(number1) / number2,
+              '%': only_numbers(operator.mod),
+              '^': power,
+              arithmetic.NEGATIVE: operator.neg,
+              '!': only_numbers(arithmetic.factorial),
+              G.SYMBOL_SQUARE_ROOT: square_root,
+              'sin': sin,
+              'cos': cos,
+              'tan': tan,
+              'In': In,
+              'log': log,
+              'factorial': only_numbers(arithmetic.factorial)}
+
+
+def evaluate(node, x):
+    """
+    Bound a tree of arithmetic.parse for all the values of the interval x.
+    """
+    return make_interval(arithmetic.evaluate(node, {'x': make_interval(x)}, OPERATIONS))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Single pass lexer for the calculator expressions.
+
+The input is read once, and transformed to a list of tokens:
+
+>>> [token.text for token in tokenize('3x^2 + 2(x)')]
+['3', '*', 'x', '**', '2', '+', '2', '*', '(', 'x', ')']
+"""
+
+from collections import namedtuple
+
+import globals as G
+
+
+NUMBER = 'number'
+CONSTANT = 'constant'
+VARIABLE = 'variable'
+NAME = 'name'
+OPERATOR = 'operator'
+
+# kind: the type of the token
+# text: the normalized text of the token, as it's understood by eval
+# value: the number for NUMBER and CONSTANT, the operator, function name
+#        or variable for the others
+Token = namedtuple('Token', ['kind', 'text', 'value'])
+
+MULTIPLICATION = Token(OPERATOR, '*', '*')
+
+# Sorted by length, so '**' is found before '*'
+SYMBOLS = [('**', '^'),
+           ('^', '^'),
+           ('*', '*'),
+           (G.OPERATOR_MUL, '*'),
+           ('/', '/'),
+           (G.OPERATOR_DIV, '/'),
+           ('+', '+'),
+           ('-', '-'),
+           ('%', '%'),
+           ('!', '!'),
+           (G.SYMBOL_SQUARE_ROOT, G.SYMBOL_SQUARE_ROOT),
+           ('(', '('),
+           (')', ')'),
+           ('=', '=')]
+
+SYMBOLS_TEXT = {'^': '**'}
+
+# The symbols by their first character, to find them without trying all
+SYMBOLS_BY_CHAR = {}
+for symbol, operator in SYMBOLS:
+    SYMBOLS_BY_CHAR.setdefault(symbol[0], []).append((symbol, operator))
+
+CONSTANTS = {'pi': G.PI,
+             'π': G.PI}
+
+VARIABLES = ['x', 'y']
+
+# Lowercase names, and the names that understand eval
+NAMES = {'sin': 'sin',
+         'sen': 'sin',
+         'cos': 'cos',
+         'tan': 'tan',
+         'in': 'In',
+         'log': 'log',
+         'factorial': 'factorial'}
+
+# Sorted by length, so 'factorial' is found before 'f'
+WORDS = sorted(list(NAMES.keys()) + list(CONSTANTS.keys()) + VARIABLES,
+               key=len, reverse=True)
+
+DIGITS = '0123456789.'
+
+
+def is_factor_end(token):
+    """
+    A token after which an implicit multiplication can start: 2(, )x, x!...
+    """
+    return token.kind in [NUMBER, CONSTANT, VARIABLE] or token.value in [')', '!']
+
+
+def is_factor_start(token):
+    return token.kind in [NUMBER, CONSTANT, VARIABLE, NAME] or token.value in ['(', G.SYMBOL_SQUARE_ROOT]
+
+
+def is_implicit(previous, token):
+    """
+    If there is an implicit multiplication between two tokens, but not
+    between two numbers: '2 3' is a typo, not 6.
+    """
+    if previous.kind == NUMBER and token.kind == NUMBER:
+        return False
+
+    return is_factor_end(previous) and is_factor_start(token)
+
+
+def tokenize(text, implicit=True):
+    """
+    Read the text once, and get the list of tokens.
+
+    Uppercase names are understood, the symbols of the keypad(÷, ×, π, √)
+    are normalized, and the implicit multiplications('2x', '2(', ')(',
+    '2π'...) are made explicit if implicit is True.
+
+    A SyntaxError is raised for the unknown characters.
+    """
+    tokens = []
+    length = len(text)
+    lowered = text.lower()
+    index = 0
+
+    while index < length:
+        char = text[index]
+
+        if char.isspace():
+            index += 1
+            continue
+
+        token = None
+        if char in DIGITS:
+            end = index + 1
+            while end < length and text[end] in DIGITS:
+                end += 1
+
+            # Scientific notation, like the 1e+20 of str(float)
+            exponent = end + 2 if text[end + 1:end + 2] in ['+', '-'] else end + 1
+            if lowered[end:end + 1] == 'e' and text[exponent:exponent + 1].isdigit():
+                end = exponent + 1
+                while end < length and text[end].isdigit():
+                    end += 1
+
+            number = text[index:end]
+            try:
+                value = int(number) if number.isdigit() else float(number)
+            except ValueError:
+                raise SyntaxError('Bad number, "%s"' % number)
+
+            token = Token(NUMBER, number, value)
+            index = end
+
+        else:
+            for symbol, operator in SYMBOLS_BY_CHAR.get(char, ()):
+                if text.startswith(symbol, index):
+                    token = Token(OPERATOR, SYMBOLS_TEXT.get(operator, operator), operator)
+                    index += len(symbol)
+                    break
+
+        if token is None:
+            for word in WORDS:
+                if lowered.startswith(word, index):
+                    if word in CONSTANTS:
+                        token = Token(CONSTANT, repr(CONSTANTS[word]), CONSTANTS[word])
+
+                    elif word in VARIABLES:
+                        token = Token(VARIABLE, word, word)
+
+                    else:
+                        token = Token(NAME, NAMES[word], NAMES[word])
+
+                    index += len(word)
+                    break
+
+        if token is None:
+            if not char.isalpha():
+                raise SyntaxError('Unexpected character, "%s"' % char)
+
+            # An unknown name, like the f of 'f(x) ='
+            token = Token(NAME, char.lower(), char.lower())
+            index += 1
+
+        if implicit and tokens and is_implicit(tokens[-1], token):
+            tokens.append(MULTIPLICATION)
+
+        tokens.append(token)
+
+    return tokens
+
+
+def to_string(tokens):
+    """
+    Join the tokens into a string that can be evaluated, two numbers are
+    kept apart so they aren't joined in another number.
+
+    >>> to_string(tokenize('2 3 + 2x'))
+    '2 3+2*x'
+    """
+    texts = []
+    for index, token in enumerate(tokens):
+        if index and token.kind == NUMBER and tokens[index - 1].kind == NUMBER:
+            texts.append(' ')
+
+        texts.append(token.text)
+
+    return ''.join(texts)
+
+
+def split(tokens, operator):
+    """
+    Split a list of tokens by an operator, like str.split.
+    """
+    parts = [[]]
+    for token in tokens:
+        if token.kind == OPERATOR and token.value == operator:
+            parts.append([])
+
+        else:
+            parts[-1].append(token)
+
+    return parts
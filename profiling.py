@@ -0,0 +1,206 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Times of the stages of a calculation and of a redraw.
+
+Nothing is measured until enable() is called, then the functions of the
+stages are replaced by functions that count the calls and their time, and
+disable() puts the original functions back. So there is no cost when the
+measurement is not enabled.
+
+>>> import profiling
+>>> import globals as G
+>>> profiling.enable()
+>>> G.simplify('2 + 2')
+'4'
+>>> profiling.get_stats()['globals.simplify']['calls']
+1
+>>> profiling.disable()
+
+Setting the environment variable CALCULATOR_PROFILE enables it when
+enable_from_environment() is called by the calculators and by the batch
+command line, that then calculates in a single process. The summary is
+written to stderr at exit, or saved as JSON if the variable is the path
+of a .json file:
+
+    CALCULATOR_PROFILE=1 python calculator.py
+    CALCULATOR_PROFILE=stages.json python -m batch exercises.txt
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+
+ENVIRONMENT_VARIABLE = 'CALCULATOR_PROFILE'
+
+# (module, class or None, function)
+STAGES = [('globals', None, 'clean_string'),
+          ('globals', None, 'simplify'),
+          ('lexer', None, 'tokenize'),
+          ('arithmetic', None, 'parse'),
+          ('arithmetic', None, 'evaluate'),
+          ('expressions', None, 'parse_monomial'),
+          ('expressions', None, 'parse_terms'),
+          ('expressions', 'Polynomial', 'parse_string'),
+          ('expressions', 'Equation', 'solve'),
+          ('expressions', 'Function', '__call__'),
+          ('expressions', 'Function', 'evaluate_many'),
+          ('expressions', 'Function', 'evaluate_interval'),
+          ('graph', 'GraphArea', 'render'),
+          ('graph', 'GraphArea', 'get_background'),
+          ('graph', 'GraphArea', 'render_background'),
+          ('graph', 'GraphArea', 'render_grid'),
+          ('graph', 'GraphArea', 'render_axis'),
+          ('graph', 'GraphArea', 'render_graph'),
+          ('graph', 'GraphArea', 'sample_function'),
+          ('graph', 'GraphArea', 'sample_intervals')]
+
+STATS = {}  # {name: [calls, seconds]}
+
+originals = {}  # {name: (owner, function)}
+
+
+def get_name(module, owner, function):
+    return '.'.join([part for part in [module, owner, function] if part])
+
+
+def measure(name, function):
+    stats = STATS.setdefault(name, [0, 0.0])
+
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += time.time() - start
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def enable():
+    """
+    Start to measure the stages of the modules already imported, so
+    graph isn't imported by the batch command line.
+    """
+    for module_name, owner_name, function_name in STAGES:
+        name = get_name(module_name, owner_name, function_name)
+        module = sys.modules.get(module_name)
+        if name in originals or module is None:
+            continue
+
+        owner = getattr(module, owner_name) if owner_name else module
+        function = owner.__dict__[function_name] if owner_name else getattr(owner, function_name)
+
+        originals[name] = (owner, function)
+        setattr(owner, function_name, measure(name, function))
+
+
+def disable():
+    for name, (owner, function) in originals.items():
+        setattr(owner, name.split('.')[-1], function)
+
+    originals.clear()
+
+
+def is_enabled():
+    return bool(originals)
+
+
+def reset():
+    for stats in STATS.values():
+        stats[0] = 0
+        stats[1] = 0.0
+
+
+def merge(stats):
+    """
+    Add the stats of get_stats() of another process, like the worker.
+    """
+    for name, values in stats.items():
+        totals = STATS.setdefault(name, [0, 0.0])
+        totals[0] += values['calls']
+        totals[1] += values['seconds']
+
+
+def record(name, seconds):
+    """
+    Add a time measured apart, like the time until the first frame. It's
+    ignored if the measurement isn't enabled.
+    """
+    if is_enabled():
+        merge({name: {'calls': 1, 'seconds': seconds}})
+
+
+def get_stats():
+    """
+    The calls and the time of each measured stage, the time of a stage
+    includes the time of the stages that it calls.
+    """
+    result = {}
+    for name, (calls, seconds) in STATS.items():
+        if calls:
+            result[name] = {'calls': calls,
+                            'seconds': seconds,
+                            'mean': seconds / calls}
+
+    return result
+
+
+def get_summary():
+    stats = get_stats()
+    width = max([len(name) for name in stats] + [5])
+    lines = ['%-*s %9s %12s %12s' % (width, 'stage', 'calls', 'total ms', 'mean us')]
+
+    for name in sorted(stats, key=lambda name: stats[name]['seconds'], reverse=True):
+        lines.append('%-*s %9d %12.3f %12.3f' % (width, name, stats[name]['calls'],
+                                                 stats[name]['seconds'] * 1e3,
+                                                 stats[name]['mean'] * 1e6))
+
+    return '\n'.join(lines)
+
+
+def dump(path):
+    with open(path, 'w') as file:
+        json.dump(get_stats(), file, indent=4, sort_keys=True)
+
+
+def report(destination):
+    if destination.endswith('.json'):
+        dump(destination)
+    else:
+        sys.stderr.write(get_summary() + '\n')
+
+
+def enable_from_environment():
+    """
+    Enable the measurement if CALCULATOR_PROFILE is set, and report it at
+    exit.
+    """
+    destination = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not destination or is_enabled():
+        return
+
+    enable()
+    atexit.register(report, destination)
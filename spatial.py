@@ -0,0 +1,170 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Store of points of the plane, hashed and grouped in square cells:
+
+>>> store = PointStore()
+>>> store.add(1, 2), store.add(1, 2), (1, 2) in store
+(True, False, True)
+>>> store.add(5.5, -3)
+True
+>>> list(store.get_range(0, 2, 0, 3))
+[(1, 2)]
+>>> store.get_nearest(5, -3)
+(5.5, -3)
+"""
+
+import math
+
+
+class PointStore(object):
+    """
+    The points are kept in a set, for the membership, and in cells of
+    cell_size units, so the points of a region are found without looking
+    at all of them.
+    """
+
+    def __init__(self, points=[], cell_size=1.0):
+        self.cell_size = float(cell_size)
+        self.points = set()
+        self.cells = {}  # {(column, row): set of points}
+
+        for x, y in points:
+            self.add(x, y)
+
+    def __contains__(self, point):
+        return point in self.points
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def get_cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def add(self, x, y):
+        """
+        Add a point, and return False if it already was in the store.
+        """
+        if (x, y) in self.points:
+            return False
+
+        self.points.add((x, y))
+        self.cells.setdefault(self.get_cell(x, y), set()).add((x, y))
+        return True
+
+    def remove(self, x, y):
+        """
+        Remove a point, and return False if it wasn't in the store.
+        """
+        if (x, y) not in self.points:
+            return False
+
+        self.points.remove((x, y))
+        cell = self.get_cell(x, y)
+        self.cells[cell].remove((x, y))
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+        return True
+
+    def clear(self):
+        self.points = set()
+        self.cells = {}
+
+    def get_range(self, min_x, max_x, min_y, max_y):
+        """
+        Iterate over the points inside of a rectangle, like the viewport.
+        """
+        min_column, min_row = self.get_cell(min_x, min_y)
+        max_column, max_row = self.get_cell(max_x, max_y)
+
+        if (max_column - min_column + 1) * (max_row - min_row + 1) > len(self.cells):
+            # A big rectangle, the cells with points are less
+            cells = [cell for cell in self.cells
+                     if min_column <= cell[0] <= max_column and min_row <= cell[1] <= max_row]
+        else:
+            cells = [(column, row) for column in range(min_column, max_column + 1)
+                     for row in range(min_row, max_row + 1) if (column, row) in self.cells]
+
+        for cell in cells:
+            for x, y in self.cells[cell]:
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield (x, y)
+
+    def get_nearest(self, x, y, max_distance=None):
+        """
+        Get the point nearest to (x, y), or None if there isn't a point
+        at less than max_distance.
+
+        The cells are visited in rings around the cell of (x, y), until
+        a ring is farther than the nearest point found.
+        """
+        if not self.points:
+            return None
+
+        column, row = self.get_cell(x, y)
+        if max_distance is None:
+            columns = [cell[0] for cell in self.cells]
+            rows = [cell[1] for cell in self.cells]
+            max_ring = max(abs(column - min(columns)), abs(column - max(columns)),
+                           abs(row - min(rows)), abs(row - max(rows)))
+        else:
+            max_ring = int(math.ceil(max_distance / self.cell_size))
+
+        nearest = None
+        nearest_distance = max_distance
+        ring = 0
+        while ring <= max_ring:
+            if nearest is not None and (ring - 1) * self.cell_size > nearest_distance:
+                break
+
+            for cell in self.get_ring(column, row, ring):
+                for point in self.cells.get(cell, ()):
+                    distance = math.hypot(point[0] - x, point[1] - y)
+                    if nearest_distance is None or distance <= nearest_distance:
+                        if nearest is None or distance < nearest_distance or point < nearest:
+                            nearest = point
+                            nearest_distance = distance
+
+            ring += 1
+
+        return nearest
+
+    def get_ring(self, column, row, ring):
+        """
+        The cells at a distance of ring cells from (column, row).
+        """
+        if ring == 0:
+            return [(column, row)]
+
+        cells = []
+        for n in range(-ring, ring + 1):
+            cells.append((column + n, row - ring))
+            cells.append((column + n, row + ring))
+
+        for n in range(-ring + 1, ring):
+            cells.append((column - ring, row + n))
+            cells.append((column + ring, row + n))
+
+        return cells
@@ -30,12 +30,17 @@ from sugar3.activity.widgets import ActivityToolbarButton
 from sugar3.activity.widgets import StopButton
 from sugar3.activity import activity
 
-from expressions import Expression
+from worker import Worker
+from worker import report_error
+
+import profiling
 
 from widgets import Entry
-from widgets import ButtonSimple
-from widgets import ButtonOperator
-from widgets import ButtonSpecial
+from widgets import Stack
+from widgets import Keypad
+from widgets import STYLE_SIMPLE
+from widgets import STYLE_OPERATOR
+from widgets import STYLE_SPECIAL
 
 import globals as G
 
@@ -45,16 +50,21 @@ class Calculator(activity.Activity):
     def __init__(self, handle):
         activity.Activity.__init__(self, handle)
 
+        profiling.enable_from_environment()
+
         self.modify_bg(Gtk.StateType.NORMAL, Gdk.color_parse('#4C4C4C'))
 
+        self.worker = Worker()
+
         self.vbox = Gtk.VBox()
         self.vbox.set_border_width(10)
 
         self.entry = Entry(sugar=True)
         self.entry.connect('activate', self.calculate)
+        self.entry.connect('cancel', lambda entry: self.worker.cancel())
         self.vbox.pack_start(self.entry, False, False, 0)
 
-        self.stack = Gtk.Stack()
+        self.stack = Stack()
         self.stack.set_transition_type(
             Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
         self.stack.set_transition_duration(1000)
@@ -73,42 +83,38 @@ class Calculator(activity.Activity):
         self.show_all()
 
     def calculate(self, entry):
-        expression = str(Expression(self.entry.get_text()))
-        self.entry.set_text('0' + expression if expression[0] == '.' else expression)
+        self.entry.set_busy(True)
+        self.worker.calculate(self.entry.get_text(), self.calculate_cb)
 
-    def make_buttons(self):
-        grid = Gtk.Grid()
-        self.stack.add_titled(grid, 'simple', 'Simple')
+    def calculate_cb(self, text, expression, error):
+        self.entry.set_busy(False)
+        if error is not None:
+            report_error(text, error)
+            return  # The text of the user is kept
 
-        text = self.entry.get_text()
+        result = str(expression)
+        self.entry.set_text('0' + result if result[0] == '.' else result)
+
+    def make_buttons(self):
         buttons = [['7', '8', '9'],
                    ['4', '5', '6'],
                    ['1', '2', '3'],
                    ['.', '0', '=']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSimple)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
-
-            n_row += 1
+        keypad = self.make_keypad(buttons, STYLE_SIMPLE)
+        self.stack.add_titled(keypad, 'simple', 'Simple')
 
-        self.vbox_operators = Gtk.VBox()
-        grid.attach(self.vbox_operators, 4, 0, 1, 4)
+        # A column of operators, at the right of the numbers
+        operators = [G.SYMBOL_DEL] + G.OPERATORS
+        height = float(len(buttons)) / len(operators)
+        for n, operator in enumerate(operators):
+            keypad.add_key(operator, 3, n * height, 1, height, STYLE_OPERATOR)
 
-        button = self.make_button(G.SYMBOL_DEL, _class=ButtonOperator)
-        self.vbox_operators.add(button)
-
-        for operator in G.OPERATORS:
-            button = self.make_button(operator, _class=ButtonOperator)
-            self.vbox_operators.add(button)
+        self.stack.add_lazy_titled(self.make_complex_page, 'complex', 'Complex')
 
+    def make_complex_page(self, box):
         hbox = Gtk.HBox()
-        self.stack.add_titled(hbox, 'complex', 'Complex')
+        box.pack_start(hbox, True, True, 0)
 
         stack = Gtk.Stack()
         stack.set_transition_type(Gtk.StackTransitionType.SLIDE_UP_DOWN)
@@ -120,42 +126,18 @@ class Calculator(activity.Activity):
         hbox.pack_start(stack, True, True, 0)
         hbox.pack_end(stack_switcher, False, False, 10)
 
-        grid = Gtk.Grid()
-        stack.add_titled(grid, 'first', '')
-
         buttons = [['sen', 'cos', 'tan', 'In'],
                    ['log', '!', 'PI', 'e'],
                    ['^', '(', ')', 'V'],
                    ['¡', '%', 'x', 'f(x) = ']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSpecial)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
-
-            n_row += 1
-
-        grid = Gtk.Grid()
-        stack.add_titled(grid, 'second', '')
+        stack.add_titled(self.make_keypad(buttons, STYLE_SPECIAL), 'first', '')
 
         buttons = [['A', 'B', 'C'],
                    ['D', 'E', 'F'],
                    ['Dec', 'Hex', 'Bin']]
 
-        n_row = 0
-        for row in buttons:
-            columna = 0
-            for signo in row:
-                button = self.make_button(signo, _class=ButtonSpecial)
-                grid.attach(button, columna, n_row, 1, 1)
-
-                columna += 1
-
-            n_row += 1
+        stack.add_titled(self.make_keypad(buttons, STYLE_SPECIAL), 'second', '')
 
         button1, button2 = stack_switcher.get_children()
         stack_switcher.remove(button1)
@@ -168,16 +150,18 @@ class Calculator(activity.Activity):
         buttonbox.add(button1)
         buttonbox.add(button2)
 
-    def make_button(self, label, _class=None):
-        button = _class(label) if _class else Gtk.Button(label)
-        button.set_hexpand(True)
-        button.set_vexpand(True)
+    def make_keypad(self, rows, style):
+        keypad = Keypad(rows, style)
+        keypad.set_hexpand(True)
+        keypad.set_vexpand(True)
+        keypad.connect('activate-key', self.__key_activated_cb)
+        return keypad
 
+    def __key_activated_cb(self, keypad, label):
         if label in ['sen', 'cos', 'tan', 'In', 'log']:
             label += '()'
 
-        button.connect('clicked', self.insert_from_button, label)
-        return button
+        self.insert_from_button(keypad, label)
 
     def make_toolbar(self):
         toolbarbox = ToolbarBox()
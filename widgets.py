@@ -17,6 +17,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+import math
 import cairo
 
 from gi.repository import Gtk
@@ -24,463 +25,63 @@ from gi.repository import Gdk
 from gi.repository import Pango
 from gi.repository import GObject
 
-from expressions import Monomial
-from expressions import Polynomial
-from expressions import Equation
-from expressions import Function
-
 import globals as G
 
-
-class GraphArea(Gtk.DrawingArea):
-
-    def __init__(self, functions=[]):
-        Gtk.DrawingArea.__init__(self)
-
-        self.functions = []
-        for function in functions:
-            if type(function) == str:
-                function = Function(function)
-
-            if type(function) == Function:
-                self.functions.append(function)
-
-        self.context = None
-        self.background_color = (1, 1, 1)
-        self.axis_color = (0, 0, 0)
-        self.grid_color = (0.8, 0.8, 0.8)
-        self.line_color = (0, 0, 1)
-        self.line_width = 2
-        self.axis_width = 4
-        self.grid_width = 1
-        self.unit_space = 50
-        self.font_size = self.unit_space / 2.0
-        self.font_color = (0.4, 0.4, 0.4)
-        self.points = []
-        self.point_color = (1, 0, 0)
-        self.point_width = 5
-        self.init_x = 0
-        self.init_y = 0
-        self.drag_point = None
-        self.min_x = 0
-        self.max_x = 0
-        self.min_y = 0
-        self.max_y = 0
-        self.menu = None
-        self.f_cursor_pos = (0.0, 0.0)
-        self.i_cursor_pos = (0, 0)
-
-        self.add_events(Gdk.EventMask.SCROLL_MASK |
-                        Gdk.EventMask.BUTTON_PRESS_MASK |
-                        Gdk.EventMask.BUTTON_RELEASE_MASK |
-                        Gdk.EventMask.POINTER_MOTION_MASK)
-
-        self.connect('scroll-event', self.__scroll_event_cb)
-        self.connect('button-press-event', self.__button_press_event_cb)
-        self.connect('button-release-event', self.__button_release_event_cb)
-        self.connect('motion-notify-event', self.__button_motion_event_cb)
-        self.connect('draw', self.__draw_cb)
-
-    def __scroll_event_cb(self, widget, event):
-        scroll = event.get_scroll_direction()[1]
-        if scroll == Gdk.ScrollDirection.UP:
-            if self.unit_space < 200:
-                self.unit_space += 10
-
-        elif scroll == Gdk.ScrollDirection.DOWN:
-            if self.unit_space > 20:
-                self.unit_space -= 10
-
-        self.font_size = self.unit_space / 2.0
-        GObject.idle_add(self.queue_draw)
-
-    def __button_press_event_cb(self, widget, event):
-        if event.button == 1:
-            self.drag_point = (event.x - self.init_x, event.y - self.init_y)
-
-        elif event.button == 3:
-            self.make_menu(event.x, event.y)
-            self.menu.popup(None, None, None, None, event.button, event.time)
-            return True
-
-    def __button_release_event_cb(self, widget, event):
-        self.drag_point = None
-
-    def __button_motion_event_cb(self, widget, event):
-        fx, fy = self.get_symbolic_point(event.x, event.y)
-        self.f_cursor_pos = (fx, fy)
-        self.i_cursor_pos = (int(round(fx)), int(round(fy)))
-
-        if self.drag_point:
-            self.init_x = event.x - self.drag_point[0]
-            self.init_y = event.y - self.drag_point[1]
-
-            GObject.idle_add(self.queue_draw)
-
-    def __draw_cb(self, widget, context):
-        allocation = self.get_allocation()
-        self.context = context
-        self.width = allocation.width
-        self.height = allocation.height
-
-        self.render()
-
-    def make_menu(self, x, y):
-        fx, fy = self.f_cursor_pos
-        ix, iy = self.i_cursor_pos
-        self.menu = Gtk.Menu()
-
-        item = Gtk.MenuItem('Go to (0.0)')
-        item.connect('activate', lambda item: self.go_to(0, 0, True))
-        self.menu.append(item)
-
-        if not (ix, iy) in self.points:
-            item = Gtk.MenuItem('Make a point to (%d; %d)' % (ix, iy))
-            item.connect('activate', lambda item: self.add_point(ix, iy))
-
-        else:
-            item = Gtk.MenuItem('Remove point (%d; %d)' % (ix, iy))
-            item.connect('activate', lambda item: self.remove_point(ix, iy))
-
-        self.menu.append(item)
-
-        item = Gtk.MenuItem('Make a point to (%f; %f)' % (fx, fy))
-        item.connect('activate', lambda item: self.add_point(fx, fy))
-
-        self.menu.append(item)
-        self.menu.show_all()
-
-    def go_to(self, x, y, from_menu=True):
-        if from_menu:
-            self.unit_space = 50
-            self.font_size = 25.0
-
-        self.init_x = x
-        self.init_y = y
-        GObject.idle_add(self.queue_draw)
-
-    def add_function(self, function, update=True):
-        if type(function) == str:
-            function = Function(function)
-            color = self.line_color
-
-        if type(function) == Function:
-            self.functions.append(function)
-            if update:
-                GObject.idle_add(self.queue_draw)
-
-    def remove_function(self, function, update=True):
-        if function in self.functions:
-            self.functions.remove(function)
-            if update:
-                GObject.idle_add(self.queue_draw)
-
-    def add_point(self, x, y, update=True):
-        if not (x, y) in self.points:
-            self.points.append((x, y))
-            if update:
-                GObject.idle_add(self.queue_draw)
-
-    def remove_point(self, x, y, update=True):
-        if (x, y) in self.points:
-            self.points.remove((x, y))
-            if update:
-                GObject.idle_add(self.queue_draw)
-
-    def render(self):
-        self.render_background()
-        self.render_grid()
-        self.render_axis()
-
-        for function in self.functions:
-            self.render_graph(function)
-
-        for point in self.points:
-            self.draw_point(*point)
-
-    def render_background(self):
-        self.context.set_source_rgb(*self.background_color)
-        self.context.rectangle(0, 0, self.width, self.height)
-        self.context.fill()
-
-    def render_grid(self):
-        x = self.init_x + self.width / 2.0
-        y = self.height / 2.0 + self.init_y
-
-        self.context.set_line_width(self.grid_width)
-        self.context.set_font_size(self.font_size)
-
-        _x = x + self.axis_width / 2.0
-        n = 0
-        while _x < self.width + 2:
-            _x += self.unit_space
-            self.context.set_source_rgb(*self.grid_color)
-            self.context.move_to(_x, 0)
-            self.context.line_to(_x, self.height)
-
-            self.context.set_source_rgb(*self.font_color)
-            self.context.move_to(_x - self.unit_space, self.height / 2.0 + self.init_y + self.unit_space / 2.0)
-            self.context.show_text(str(n))
-
-            n += 1
-            self.max_x = n + 2
-
-        _x = x - self.axis_width / 2.0
-        n = 0
-        while _x > 0:
-            self.context.set_source_rgb(*self.grid_color)
-            _x -= self.unit_space
-            self.context.move_to(_x, 0)
-            self.context.line_to(_x, self.height)
-
-            if n != 0:
-                self.context.set_source_rgb(*self.font_color)
-                self.context.move_to(_x + self.unit_space, self.height / 2.0 + self.init_y + self.unit_space / 2.0)
-                self.context.show_text('-' + str(n))
-
-            n += 1
-            self.min_x = -n - 2
-
-        self.min_x
-        _y = y + self.axis_width / 2.0
-        n = 0
-        while _y < self.height:
-            _y += self.unit_space
-            self.context.move_to(0, _y)
-            self.context.line_to(self.width, _y)
-
-            if n != 0:
-                self.context.set_source_rgb(*self.font_color)
-                self.context.move_to(self.width / 2.0 + self.init_x + self.font_size / 3.0, _y - self.unit_space / 2.0)
-                self.context.show_text('-' + str(n))
-
-            n += 1
-            self.min_y = -n - 2
-
-        _y = y - self.axis_width / 2.0
-        n = 0
-        while _y > 0:
-            _y -= self.unit_space
-            self.context.move_to(0, _y)
-            self.context.line_to(self.width, _y)
-
-            if n != 0:
-                self.context.set_source_rgb(*self.font_color)
-                self.context.move_to(self.width / 2.0 + self.init_x + self.font_size / 3.0, _y + self.unit_space * 3 / 2.0)
-                self.context.show_text(str(n))
-
-            n += 1
-            self.max_y = n + 2
-
-        self.context.stroke()
-
-    def render_axis(self):
-        self.context.set_source_rgb(*self.axis_color)
-        self.context.set_line_width(self.axis_width)
-        self.context.move_to(0, self.height / 2.0 + self.init_y)
-        self.context.line_to(self.width, self.height / 2.0 + self.init_y)
-        self.context.move_to(self.width / 2.0 + self.init_x, 0)
-        self.context.line_to(self.width / 2.0 + self.init_x, self.height)
-        self.context.stroke()
-
-    def render_graph(self, function):
-        color = function.color
-        if function.degree in [0, 1]:
-            # Draw a line
-            # General expresion:
-            #   ax + b
-            x1, y1 = self.get_real_point(float(self.max_x), float(function(self.max_x)))
-            x2, y2 = self.get_real_point(float(self.min_x), float(function(self.min_x)))
-
-            self.context.set_source_rgb(*color)
-            self.context.set_line_width(self.line_width)
-            self.context.move_to(x1, y1)
-            self.context.line_to(x2, y2)
-            self.context.stroke()
-
-            self.add_point(0, float(function(0)))
-
-        elif function.degree == 2:
-            # Draw a parable
-            # General expresion:
-            #   ax^2 + bx + c
-
-            a = function.get_coefficient(2)
-            b = function.get_coefficient(1)
-            c = function.get_coefficient(0)
-
-            m = 1 if a >= 0 else -1
-            vx, vy = function.get_vertex()
-
-            self.context.set_line_width(self.line_width)
-            self.context.set_source_rgb(*function.color)
-            self.context.move_to(*self.get_real_point(*function.get_vertex()))
-
-            n1 = self.min_x - 2
-            n2 = self.max_x + 2
-
-            self.context.move_to(*self.get_real_point(n1, function(n1)))
-
-            for e in range(n1, n2):
-                for i in range(0, 11):
-                    x = e + (i * 0.1) - (abs(b) * m)
-                    y = function(x)
-                    _x, _y = self.get_real_point(x, y)
-                    if _y > self.unit_space * -2 and _y < self.height + self.unit_space * 2:
-                        self.context.line_to(_x, _y)
-
-                    else:
-                        self.context.move_to(_x, _y)
-
-            self.context.stroke()
-
-    def draw_point(self, x, y, color=None, size=None):
-        x, y = self.get_real_point(x, y)
-        if color is None:
-            color = self.point_color
-
-        if len(color) == 3:
-            color += (1.0,)
-
-        if not size:
-            size = self.point_width
-
-        self.context.set_source_rgba(*color)
-        self.context.arc(x, y, size, 0, 2 * G.PI)
-        self.context.fill()
-
-    def draw_curve(self, x1, y1, x2, y2, x3, y3, color=None, line_width=None):
-        x1, y1 = self.get_real_point(x1, y1)
-        x2, y2 = self.get_real_point(x2, y2)
-        x3, y3 = self.get_real_point(x3, y3)
-
-        if not color:
-            color = self.line_color
-
-        if not line_width:
-            line_width = self.line_width
-
-        self.context.set_source_rgb(*color)
-        self.context.set_line_width(self.line_width)
-
-        self.context.move_to(x1, y1)
-        self.context.curve_to(x1, y1, x2, y2, x3, y3)
-        self.context.stroke()
-
-    def get_real_point(self, x, y):
-        _x = x * self.unit_space
-        _x += self.width / 2.0
-        _x += self.init_x
-        if x != 0:
-            _x += self.axis_width / 2.0 if x > 0 else self.axis_width / - 2.0
-
-        _y = y * -self.unit_space
-        _y += self.height / 2.0
-        _y += self.init_y
-        if y != 0:
-            _y -= self.axis_width / 2.0 if y > 0 else self.axis_width / - 2.0
-
-        return (_x, _y)
-
-    def get_symbolic_point(self, x, y):
-        _x = x
-        _y = y
-
-        _x -= self.width / 2.0
-        _x -= self.init_x
-        if x != 0:
-            _x -= self.axis_width / 2.0 if x > 0 else self.axis_width / - 2.0
-        _x /= self.unit_space
-
-        _y -= self.height / 2.0
-        _y -= self.init_y
-        if y != 0:
-            _y -= self.axis_width / 2.0 if y > 0 else self.axis_width / - 2.0
-
-        _y /= -self.unit_space
-
-        return (_x, _y)
-
-
-class GraphList(Gtk.ScrolledWindow):
-
-    __gsignals__ = {
-        'remove-function': (GObject.SIGNAL_RUN_FIRST, None, [object]),
-        'update-request': (GObject.SIGNAL_RUN_FIRST, None, []),
-    }
-
-    def __init__(self):
-        Gtk.ScrolledWindow.__init__(self)
-
-        self.rows = {}
-
-        self.listbox = Gtk.ListBox()
-        self.add(self.listbox)
-        self.set_size_request(200, -1)
-
-    def add_function(self, function):
-        color = G.color_cairo_to_gdk(function.color)
-
-        row = Gtk.ListBoxRow()
-        self.rows[function] = row
-        self.listbox.add(row)
-
-        hbox = Gtk.HBox()
-        row.add(hbox)
-
-        label = Gtk.Label(function.polynomial.repr)
-        label.modify_fg(Gtk.StateType.NORMAL, color)
-        hbox.pack_start(label, False, False, 0)
-
-        image = Gtk.Image.new_from_stock(Gtk.STOCK_REMOVE, Gtk.IconSize.BUTTON)
-        button = Gtk.Button(image=image)
-        button.connect('clicked', self._remove_function, function)
-        hbox.pack_end(button, False, False, 10)
-
-        button = Gtk.ColorButton()
-        button.set_color(color)
-        button.connect('color-set', self.choice_color, function)
-        hbox.pack_end(button, False, False, 0)
-
-        self.show_all()
-
-    def remove_function(self, function):
-        self.listbox.remove(self.rows[function])
-
-    def _remove_function(self, button, function):
-        self.emit('remove-function', function)
-
-    def choice_color(self, color, function):
-        if type(color) == Gtk.ColorButton:
-            color = G.color_gdk_to_cairo(color.get_color())
-
-        function.color = color
-
-
-class GraphManager(Gtk.HBox):
-
-    def __init__(self):
-        Gtk.HBox.__init__(self)
-
-        self.area = GraphArea()
-        self.list = GraphList()
-
-        self.list.connect('remove-function', lambda w, f: self.remove_function(f))
-        self.list.connect('update-request', self.update_request)
-
-        self.pack_start(self.area, True, True, 0)
-        self.pack_end(self.list, False, False, 0)
-
-    def add_function(self, function):
-        self.area.add_function(function)
-        self.list.add_function(function)
-
-    def remove_function(self, function):
-        self.area.remove_function(function)
-        self.list.remove_function(function)
-
-    def update_request(self, *args):
-        self.area.queue_draw()
+# Colors of the keys
+STYLE_SIMPLE = {'label_color': (1, 1, 1),
+                'effect_color': (0.6, 0.6, 0.6),
+                'mouse_in_color': (0.4, 0.4, 0.4),
+                'mouse_out_color': (0.2980392156862745, 0.2980392156862745,
+                                    0.2980392156862745)}
+
+STYLE_OPERATOR = {'label_color': (1, 1, 1),
+                  'effect_color': (1.0, 1.0, 1.0),
+                  'mouse_in_color': (0.2, 0.3, 0.8),
+                  'mouse_out_color': (0.38, 0.52, 1.0)}
+
+STYLE_SPECIAL = {'label_color': (1, 1, 1),
+                 'effect_color': (1.0, 1.0, 1.0),
+                 'mouse_in_color': (0.4, 1.0, 0.8),
+                 'mouse_out_color': (0.25098039215686274, 0.7411764705882353,
+                                     0.6196078431372549),
+                 'insensitive_color': (0.35, 0.84, 0.72)}
+
+# {(label, font, size): (extents, mask)}, shared by all the buttons
+LABELS = {}
+LABELS_SIZE = 512
+
+
+def get_label(label, font, size):
+    """
+    Get the text extents of a label, and an A8 surface with the label drawn
+    to use as a mask. They are made once for all the buttons with the same
+    label, font and size.
+    """
+    key = (label, font, size)
+    if key not in LABELS:
+        if len(LABELS) >= LABELS_SIZE:
+            LABELS.clear()
+
+        context = cairo.Context(cairo.ImageSurface(cairo.FORMAT_A8, 1, 1))
+        context.select_font_face(font, cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
+        context.set_font_size(size)
+        extents = context.text_extents(label)
+
+        # A pixel of margin for the antialiasing
+        x_bearing, y_bearing, width, height = extents[:4]
+        mask = cairo.ImageSurface(cairo.FORMAT_A8,
+                                  int(math.ceil(width)) + 2,
+                                  int(math.ceil(height)) + 2)
+
+        context = cairo.Context(mask)
+        context.select_font_face(font, cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
+        context.set_font_size(size)
+        context.move_to(1 - x_bearing, 1 - y_bearing)
+        context.show_text(label)
+
+        LABELS[key] = (extents, mask)
+
+    return LABELS[key]
 
 
 class Entry(Gtk.HBox):
@@ -488,6 +89,7 @@ class Entry(Gtk.HBox):
     __gsignals__ = {
         'activate': (GObject.SIGNAL_RUN_FIRST, None, []),
         'changed': (GObject.SIGNAL_RUN_FIRST, None, []),
+        'cancel': (GObject.SIGNAL_RUN_FIRST, None, []),
     }
 
     __gtype_name__ = 'Entry'
@@ -495,6 +97,8 @@ class Entry(Gtk.HBox):
     def __init__(self, sugar=False):
         Gtk.HBox.__init__(self)
 
+        self.__busy = False
+        self.__text = ''
         self.__scrolled = Gtk.ScrolledWindow()
         self.__view = Gtk.TextView()
 
@@ -524,6 +128,12 @@ class Entry(Gtk.HBox):
         self.pack_end(self.__button, False, False, 1)
 
     def __key_release_event_cb(self, textview, event):
+        if self.__busy:
+            if event.keyval == 65307:  # 65307 = Escape
+                self.emit('cancel')
+
+            return True
+
         if event.keyval == 65293:  # 65293 = Enter
             self.backspace()
             self.emit('activate')
@@ -533,7 +143,34 @@ class Entry(Gtk.HBox):
         self.emit('changed')
 
     def __activate_from_button(self, button):
-        self.emit('activate')
+        self.emit('activate' if not self.__busy else 'cancel')
+
+    def set_busy(self, busy):
+        """
+        While a calculation is running the text can't be edited, a "computing"
+        message is shown, and the button cancels the calculation.
+        """
+        if busy == self.__busy:
+            return
+
+        self.__busy = busy
+        self.__view.set_editable(not busy)
+
+        if busy:
+            self.__text = self.get_text()
+            self.set_text(G.TEXT_COMPUTING)
+            self.__button.label = G.SYMBOL_CANCEL
+            self.__button.label_color = (1, 0, 0)
+
+        else:
+            self.set_text(self.__text)
+            self.__button.label = G.SYMBOL_OK
+            self.__button.label_color = (0, 1, 0)
+
+        self.__button.queue_draw()
+
+    def is_busy(self):
+        return self.__busy
 
     def set_text(self, texto):
         self.__buffer.set_text(texto)
@@ -564,6 +201,36 @@ class Entry(Gtk.HBox):
         self.__buffer.backspace(textiter, True, True)
 
 
+class Stack(Gtk.Stack):
+    """
+    A Gtk.Stack with pages that are empty until they are shown for first
+    time, so they don't slow down the start.
+    """
+
+    def __init__(self):
+        Gtk.Stack.__init__(self)
+
+        self.__pages = {}  # {name: make_page(box)}, of the pages not made yet
+        self.connect('notify::visible-child-name', self.__page_changed_cb)
+
+    def add_lazy_titled(self, make_page, name, title):
+        self.__pages[name] = make_page
+        self.add_titled(Gtk.VBox(), name, title)
+
+    def make_page(self, name):
+        """
+        Make a page now if it isn't made, like before showing a result in it.
+        """
+        make_page = self.__pages.pop(name, None)
+        if make_page is not None:
+            box = self.get_child_by_name(name)
+            make_page(box)
+            box.show_all()
+
+    def __page_changed_cb(self, stack, param):
+        self.make_page(self.get_visible_child_name())
+
+
 class ButtonBase(Gtk.DrawingArea):
 
     __gsignals__ = {
@@ -576,6 +243,7 @@ class ButtonBase(Gtk.DrawingArea):
         self.context = None
         self.limit = 0
         self.processes = {}  # {(x, y): progress}
+        self.effect_speed = 300  # Pixels per second
         self.width = 0
         self.height = 0
         self.label = label
@@ -588,6 +256,8 @@ class ButtonBase(Gtk.DrawingArea):
         self.insensitive_color = (0.5, 0.5, 0.5)
         self.background_color = self.mouse_out_color
         self.__mouse_in = False
+        self.__tick_id = None
+        self.__last_frame_time = None
 
         self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK |
                         Gdk.EventMask.BUTTON_RELEASE_MASK |
@@ -617,17 +287,52 @@ class ButtonBase(Gtk.DrawingArea):
     def __button_release_event_cb(self, area, event):
         if event.button == 1:
             self.processes[(event.x, event.y)] = 0
+            self.start_effect()
             self.emit('clicked')
 
     def __enter_notify_event_cb(self, area, event):
         self.background_color = self.mouse_in_color
         self.__mouse_in = True
-        self.__render()
+        self.queue_draw()
 
     def __leave_notify_event_cb(self, area, event):
         self.background_color = self.mouse_out_color
         self.__mouse_in = False
-        self.__render()
+        self.queue_draw()
+
+    def __tick_cb(self, area, frame_clock):
+        time = frame_clock.get_frame_time()  # In microseconds
+        if self.__last_frame_time is None:
+            step = 0
+        else:
+            step = (time - self.__last_frame_time) / 1000000.0 * self.effect_speed
+
+        self.__last_frame_time = time
+
+        processes_to_remove = []
+        for coords, progress in list(self.processes.items()):
+            self.processes[coords] = progress + step
+            if self.processes[coords] >= self.limit:
+                processes_to_remove.append(coords)
+
+        self.remove_processes(processes_to_remove)
+        self.queue_draw()
+
+        if not self.processes:
+            # Nothing to animate, the button isn't drawn again until
+            # something changes
+            self.__tick_id = None
+            return False
+
+        return True
+
+    def start_effect(self):
+        """
+        The effects are moved by the frame clock, only while there are any.
+        """
+        if self.__tick_id is None:
+            self.__last_frame_time = None
+            self.__tick_id = self.add_tick_callback(self.__tick_cb)
 
     def remove_processes(self, lista):
         if not lista:
@@ -645,73 +350,210 @@ class ButtonBase(Gtk.DrawingArea):
             return
 
         if self.label:
-            self.context.set_font_size(self.label_size)
-            self.context.select_font_face(self.label_font,
-                                          cairo.FONT_SLANT_NORMAL,
-                                          cairo.FONT_WEIGHT_NORMAL)
+            extents, mask = get_label(self.label, self.label_font, self.label_size)
+            x = (self.width - extents[2]) / 2.0 + extents[0]
+            y = (self.height + extents[3]) / 2.0 + extents[1]
 
-            w = self.context.text_extents(self.label)[2]
-            h = self.context.text_extents(self.label)[3]
-            x = (self.width - w) / 2.0
-            y = (self.height + h) / 2.0
-
-            self.context.move_to(x, y)
+            # In whole pixels, so the mask isn't blurred
             self.context.set_source_rgb(*self.label_color)
-            self.context.show_text(self.label)
+            self.context.mask_surface(mask, round(x) - 1, round(y) - 1)
 
-        processes_to_remove = []
         for coords, progress in self.processes.items():
-            transparency = 1.0 - (1.0 / self.limit * progress)
+            transparency = 1.0 - (1.0 / self.limit * progress) if self.limit else 0
             color = self.effect_color + (transparency,)
             self.context.set_source_rgba(*color)
             self.context.arc(coords[0], coords[1], progress, 0, 2 * G.PI)
             self.context.fill()
 
-            self.processes[coords] = progress + 5
 
-            if self.processes[coords] >= self.limit:
-                processes_to_remove.append(coords)
+class Key(object):
+    """
+    A key of a Keypad, its position and size are in cells of the keypad.
+    """
 
-        self.remove_processes(processes_to_remove)
+    def __init__(self, label, column, row, width=1, height=1, style=STYLE_SIMPLE):
+        self.label = label
+        self.column = column
+        self.row = row
+        self.width = width
+        self.height = height
+        self.style = style
+        self.effects = {}  # {(x, y): progress}
 
-        GObject.idle_add(self.queue_draw)
 
+class Keypad(Gtk.DrawingArea):
+    """
+    A grid of keys drawn by a single widget, instead of a widget by key.
 
-class ButtonSimple(ButtonBase):
+    The keys look and behave like the buttons, and activate-key is emitted
+    with the label of a key when it's clicked.
+    """
 
-    def __init__(self, etiqueta):
-        ButtonBase.__init__(self, etiqueta)
+    __gsignals__ = {
+        'activate-key': (GObject.SIGNAL_RUN_FIRST, None, [str]),
+    }
 
-        self.label_size = 30
-        self.label_color = (1, 1, 1)
-        self.effect_color = (0.6, 0.6, 0.6)
-        self.mouse_in_color = (0.4, 0.4, 0.4)
-        self.mouse_out_color = (
-            0.2980392156862745, 0.2980392156862745, 0.2980392156862745)
-        self.background_color = self.mouse_out_color
+    def __init__(self, rows=[], style=STYLE_SIMPLE):
+        Gtk.DrawingArea.__init__(self)
 
+        self.keys = []
+        self.columns = 0
+        self.rows = 0
+        self.label_font = 'Bold'
+        self.effect_speed = 300  # Pixels per second
+        self.mouse_in = None  # The key under the mouse
+        self.__tick_id = None
+        self.__last_frame_time = None
 
-class ButtonOperator(ButtonBase):
+        for n_row, row in enumerate(rows):
+            for column, label in enumerate(row):
+                self.add_key(label, column, n_row, style=style)
 
-    def __init__(self, etiqueta):
-        ButtonBase.__init__(self, etiqueta)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK |
+                        Gdk.EventMask.BUTTON_RELEASE_MASK |
+                        Gdk.EventMask.POINTER_MOTION_MASK |
+                        Gdk.EventMask.LEAVE_NOTIFY_MASK)
 
-        self.label_color = (1, 1, 1)
-        self.effect_color = (1.0, 1.0, 1.0)
-        self.mouse_in_color = (0.2, 0.3, 0.8)
-        self.mouse_out_color = (0.38, 0.52, 1.0)
-        self.background_color = self.mouse_out_color
+        self.connect('draw', self.__draw_cb)
+        self.connect('button-release-event', self.__button_release_event_cb)
+        self.connect('motion-notify-event', self.__motion_notify_event_cb)
+        self.connect('leave-notify-event', self.__leave_notify_event_cb)
 
+    def __draw_cb(self, area, context):
+        x1, y1, x2, y2 = context.clip_extents()
 
-class ButtonSpecial(ButtonBase):
+        for key in self.keys:
+            x, y, width, height = self.get_key_rectangle(key)
+            if x >= x2 or y >= y2 or x + width <= x1 or y + height <= y1:
+                continue  # Not damaged
 
-    def __init__(self, etiqueta):
-        ButtonBase.__init__(self, etiqueta)
+            self.render_key(context, key, x, y, width, height)
 
-        self.label_color = (1, 1, 1)
-        self.effect_color = (1.0, 1.0, 1.0)
-        self.mouse_in_color = (0.4, 1.0, 0.8)
-        self.mouse_out_color = (
-            0.25098039215686274, 0.7411764705882353, 0.6196078431372549)
-        self.insensitive_color = (0.35, 0.84, 0.72)
-        self.background_color = self.mouse_out_color
+    def __button_release_event_cb(self, area, event):
+        if event.button != 1:
+            return
+
+        key = self.get_key_at(event.x, event.y)
+        if key is not None:
+            key.effects[(event.x, event.y)] = 0
+            self.start_effect()
+            self.emit('activate-key', key.label)
+
+    def __motion_notify_event_cb(self, area, event):
+        self.set_mouse_in(self.get_key_at(event.x, event.y))
+
+    def __leave_notify_event_cb(self, area, event):
+        self.set_mouse_in(None)
+
+    def __tick_cb(self, area, frame_clock):
+        time = frame_clock.get_frame_time()  # In microseconds
+        if self.__last_frame_time is None:
+            step = 0
+        else:
+            step = (time - self.__last_frame_time) / 1000000.0 * self.effect_speed
+
+        self.__last_frame_time = time
+
+        animated = False
+        for key in self.keys:
+            if not key.effects:
+                continue
+
+            limit = max(self.get_key_rectangle(key)[2:])
+            for coords, progress in list(key.effects.items()):
+                if progress + step >= limit:
+                    del key.effects[coords]
+                else:
+                    key.effects[coords] = progress + step
+
+            self.queue_draw_key(key)
+            animated = animated or bool(key.effects)
+
+        if not animated:
+            self.__tick_id = None
+            return False
+
+        return True
+
+    def add_key(self, label, column, row, width=1, height=1, style=STYLE_SIMPLE):
+        key = Key(label, column, row, width, height, style)
+        self.keys.append(key)
+        self.columns = max(self.columns, column + width)
+        self.rows = max(self.rows, row + height)
+        self.queue_resize()
+        return key
+
+    def get_key_rectangle(self, key):
+        """
+        Get (x, y, width, height) of a key, in pixels.
+        """
+        allocation = self.get_allocation()
+        cell_width = allocation.width / float(self.columns)
+        cell_height = allocation.height / float(self.rows)
+
+        return (key.column * cell_width,
+                key.row * cell_height,
+                key.width * cell_width,
+                key.height * cell_height)
+
+    def get_key_at(self, x, y):
+        for key in self.keys:
+            kx, ky, width, height = self.get_key_rectangle(key)
+            if kx <= x < kx + width and ky <= y < ky + height:
+                return key
+
+        return None
+
+    def set_mouse_in(self, key):
+        if key is self.mouse_in:
+            return
+
+        for _key in [self.mouse_in, key]:
+            if _key is not None:
+                self.queue_draw_key(_key)
+
+        self.mouse_in = key
+
+    def queue_draw_key(self, key):
+        x, y, width, height = self.get_key_rectangle(key)
+        x1 = int(math.floor(x))
+        y1 = int(math.floor(y))
+        self.queue_draw_area(x1, y1, int(math.ceil(x + width)) - x1,
+                             int(math.ceil(y + height)) - y1)
+
+    def start_effect(self):
+        if self.__tick_id is None:
+            self.__last_frame_time = None
+            self.__tick_id = self.add_tick_callback(self.__tick_cb)
+
+    def render_key(self, context, key, x, y, width, height):
+        style = key.style
+        context.save()
+        context.rectangle(x, y, width, height)
+        context.clip()
+
+        if key is self.mouse_in:
+            context.set_source_rgb(*style['mouse_in_color'])
+        else:
+            context.set_source_rgb(*style['mouse_out_color'])
+
+        context.paint()
+
+        if key.label:
+            # In whole points, so a resize doesn't fill the cache of labels
+            size = int(min(width, height) / 2.0)
+            extents, mask = get_label(key.label, self.label_font, size)
+            lx = x + (width - extents[2]) / 2.0 + extents[0]
+            ly = y + (height + extents[3]) / 2.0 + extents[1]
+
+            context.set_source_rgb(*style['label_color'])
+            context.mask_surface(mask, round(lx) - 1, round(ly) - 1)
+
+        limit = max(width, height)
+        for coords, progress in key.effects.items():
+            transparency = 1.0 - (1.0 / limit * progress)
+            context.set_source_rgba(*(style['effect_color'] + (transparency,)))
+            context.arc(coords[0], coords[1], progress, 0, 2 * G.PI)
+            context.fill()
+
+        context.restore()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015, Cristian García <cristian99garcia@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""
+Evaluation of the expressions out of the main loop.
+
+Each calculation runs in its own process, so it can be stopped when it
+takes too long or when the user cancels it. The process sends back the
+Expression, that is kept in the cache of expressions of the main process,
+so a repeated calculation doesn't start a process.
+"""
+
+import sys
+import threading
+import multiprocessing
+
+from gi.repository import GLib
+from gi.repository import GObject
+
+from expressions import CACHE
+from expressions import Expression
+from expressions import share_expression
+
+import profiling
+import globals as G
+
+TIMEOUT = 10  # Seconds
+
+ERROR_TIMEOUT = 'timeout'
+ERROR_CANCELLED = 'cancelled'
+
+GObject.threads_init()
+
+
+def run(key, connection):
+    """
+    Calculate a normalized expression and send (expression, error), and the
+    times of the stages if they are measured.
+    """
+    profiling.reset()  # Only the stages of this calculation
+
+    try:
+        result = (Expression(key), None)
+
+    except Exception as error:
+        result = (None, get_message(error))
+
+    connection.send(result + (profiling.get_stats(),))
+
+    connection.close()
+
+
+def get_message(error):
+    return '%s: %s' % (type(error).__name__, error)
+
+
+def report_error(text, error):
+    """
+    Write the error of a calculation in stderr, like the exceptions of the
+    calculations made in the main loop. The cancelled ones aren't errors.
+    """
+    if error != ERROR_CANCELLED:
+        sys.stderr.write('%s: %s\n' % (text, error))
+
+
+class Worker(object):
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.process = None
+
+    def calculate(self, text, callback):
+        """
+        Start to calculate text, the previous calculation is stopped and its
+        callback isn't called.
+
+        callback(text, expression, error) is called from the main loop, at
+        once if the expression is in the cache. error is None, ERROR_TIMEOUT,
+        ERROR_CANCELLED or the message of the exception of the calculation,
+        and then expression is None.
+        """
+        self.cancel()
+        self.process = None
+
+        try:
+            key = G.clean_string(text)
+
+        except Exception as error:
+            callback(text, None, get_message(error))
+            return
+
+        expression = CACHE.get(key)
+        if expression is not None:
+            callback(text, share_expression(expression), None)
+            return
+
+        connection, child_connection = multiprocessing.Pipe(False)
+        self.process = multiprocessing.Process(target=run, args=(key, child_connection))
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()  # So the end of the process is seen
+
+        thread = threading.Thread(target=self.__wait,
+                                  args=(self.process, connection, key, text, callback))
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
+    def is_busy(self):
+        return self.process is not None
+
+    def __wait(self, process, connection, key, text, callback):
+        if connection.poll(self.timeout):
+            try:
+                result = connection.recv()
+                profiling.merge(result[-1])
+                result = result[:-1]
+
+            except EOFError:
+                result = (None, ERROR_CANCELLED)
+
+        else:
+            process.terminate()
+            result = (None, ERROR_TIMEOUT)
+
+        connection.close()
+        process.join()
+
+        GLib.idle_add(self.__finish, process, key, text, callback, result)
+
+    def __finish(self, process, key, text, callback, result):
+        if process is not self.process:
+            return False  # Replaced by another calculation
+
+        self.process = None
+        expression, error = result
+        if expression is not None:
+            CACHE.set(key, expression)  # Only from the main loop
+            expression = share_expression(expression)
+
+        callback(text, expression, error)
+        return False